@@ -1,9 +1,10 @@
 # coding:utf-8
+import os
 import sys
 from enum import Enum
 from PySide6.QtCore import QLocale
 from qfluentwidgets import (qconfig, QConfig, ConfigItem, OptionsConfigItem, BoolValidator,
-                            OptionsValidator, Theme, ConfigSerializer)
+                            OptionsValidator, RangeConfigItem, RangeValidator, Theme, ConfigSerializer)
 from .setting import CONFIG_FILE
 
 class Language(Enum):
@@ -42,6 +43,22 @@ class Config(QConfig):
     language = OptionsConfigItem(
         "MainWindow", "Language", Language.AUTO, OptionsValidator(Language), LanguageSerializer(), restart=True)
 
+    # data
+    # 数据源：单个 CSV、glob 通配符或按 Crop=.../Year=... 分区的目录，留空使用 app/product_regressiondb.csv
+    dataSource = ConfigItem("Data", "Source", "", restart=True)
+    readWorkers = RangeConfigItem("Data", "ReadWorkers", 4, RangeValidator(1, 32))
+    # 预训练时并行训练各作物模型的进程数
+    trainWorkers = RangeConfigItem("Data", "TrainWorkers", min(os.cpu_count() or 1, 64), RangeValidator(1, 64))
+    # 模型布局：每种作物一个模型 (PerCrop)，或所有作物共用一个以作物为类别特征的模型 (Global)
+    modelLayout = OptionsConfigItem("Data", "ModelLayout", "PerCrop", OptionsValidator(["PerCrop", "Global"]))
+    # 模型文件的存储方式：不压缩并按需映射 (Mmap)，或 zlib / lz4 压缩，见 storage 模块
+    modelStorage = OptionsConfigItem("Data", "ModelStorage", "Mmap", OptionsValidator(["Mmap", "Zlib", "LZ4"]))
+
+    # tuning
+    # 超参数调优方式：逐轮淘汰 (Halving) 或粒子群优化 (PSO)，以及全部作物的调优总时间上限（秒）
+    tuneMethod = OptionsConfigItem("Tuning", "Method", "Halving", OptionsValidator(["Halving", "PSO"]))
+    tuneTimeBudget = RangeConfigItem("Tuning", "TotalTimeBudget", 600, RangeValidator(10, 36000))
+
     # software update
     checkUpdateAtStartUp = ConfigItem("Update", "CheckUpdateAtStartUp", True, BoolValidator())
 
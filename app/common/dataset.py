@@ -0,0 +1,215 @@
+# coding: utf-8
+import hashlib
+import os
+
+import numpy as np
+import pandas as pd
+
+from . import dataset_cache, sources
+
+
+# 原始数据列名 -> 界面使用的列名
+COLUMN_MAP = {'Rainfall': '降雨量', 'Temperature': '气温', 'Ph': 'ph值', 'Crop': '作物种类', 'Production': '产量'}
+
+CROP_COLUMN = '作物种类'
+FEATURE_COLUMNS = ['降雨量', '气温', 'ph值']
+TARGET_COLUMN = '产量'
+ZSCORE_COLUMNS = FEATURE_COLUMNS + [TARGET_COLUMN]
+
+# z-score 绝对值超过该阈值的行视为异常值
+ZSCORE_THRESHOLD = 3
+
+# 超过该大小的 CSV 默认分块流式读取，避免整个文件一次性载入内存
+STREAMING_MIN_SIZE = 512 * 1024 ** 2
+# 流式读取时每块的行数，峰值内存与它成正比而与文件大小无关
+DEFAULT_CHUNKSIZE = 1_000_000
+
+
+def read_source(source, workers=1, report=None):
+    """ 读取数据源（单个 CSV、通配符或分区目录），重命名列并去除重复行 """
+    return _prepare(sources.read_files(sources.resolve(source), sources.root_directory(source), workers, report))
+
+
+def _prepare(data):
+    data.rename(columns=COLUMN_MAP, inplace=True)
+    data.drop_duplicates(inplace=True)
+    data.reset_index(drop=True, inplace=True)
+    return data
+
+
+def crop_codes(data):
+    """ 将作物种类编码为按名称排序的整数，缺失值编码为 -1 """
+    return pd.factorize(data[CROP_COLUMN], sort=True)
+
+
+def outlier_mask(data, threshold=ZSCORE_THRESHOLD, codes=None):
+    """ 按作物种类分组计算 z-score，返回每一行是否保留的布尔掩码 """
+    if codes is None:
+        codes, _ = crop_codes(data)
+    if len(data) == 0:
+        return np.zeros(0, dtype=bool)
+    # 作物种类缺失的行单独归入最后一组，原实现中 groupby 会直接丢弃这些行
+    groups = np.where(codes >= 0, codes, codes.max() + 1)
+    counts = np.bincount(groups)
+    outliers = np.zeros(len(data), dtype=bool)
+
+    for column in ZSCORE_COLUMNS:
+        values = data[column].to_numpy(dtype='float64')
+        missing = np.isnan(values)
+        mean = np.bincount(groups, weights=np.where(missing, 0, values)) / counts
+        deviation = values - mean[groups]
+        # 与 scipy.stats.zscore 一致，使用总体标准差 (ddof=0)
+        std = np.sqrt(np.bincount(groups, weights=deviation ** 2) / counts)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            z_scores = np.abs(deviation / std[groups])
+        # scipy.stats.zscore 对含缺失值或取值恒定的组返回 NaN，这些组不剔除任何行
+        propagate = np.bincount(groups, weights=missing) > 0
+        outliers |= (z_scores > threshold) & ~propagate[groups]
+
+    return (codes >= 0) & ~outliers
+
+
+def remove_outliers(data, threshold=ZSCORE_THRESHOLD):
+    """ 剔除每种作物中的异常值，行顺序与逐组拼接的结果一致（按作物排序，组内保持原顺序） """
+    codes, crops = crop_codes(data)
+    mask = outlier_mask(data, threshold, codes)
+    # 作物种类通常不多，缩小整数宽度后 numpy 的稳定排序会走基数排序
+    order = np.argsort(codes[mask].astype(np.min_scalar_type(len(crops))), kind='stable')
+    return data[mask].iloc[order]
+
+
+def compact(data):
+    """ 转换为紧凑的内存布局：作物种类为分类类型，特征和产量为 float32，只保留建模用到的列 """
+    columns = {CROP_COLUMN: pd.Categorical(data[CROP_COLUMN])}
+    for column in FEATURE_COLUMNS + [TARGET_COLUMN]:
+        columns[column] = data[column].to_numpy(dtype='float32')
+    return pd.DataFrame(columns, columns=FEATURE_COLUMNS + [CROP_COLUMN, TARGET_COLUMN])
+
+
+def data_fingerprint(*arrays):
+    """ 数组内容（含类型和形状）的摘要，内容相同的数据摘要相同 """
+    digest = hashlib.blake2b(digest_size=16)
+    for array in arrays:
+        array = np.ascontiguousarray(array)
+        digest.update(f'{array.dtype.str}{array.shape};'.encode('ascii'))
+        digest.update(array.view(np.uint8))
+    return digest.hexdigest()
+
+
+def load_dataset(source, threshold=ZSCORE_THRESHOLD, use_cache=True, chunksize=None, workers=1, report=None):
+    """ 读取并清洗数据，源文件或清洗参数变化时自动重建缓存
+
+    source 可以是单个 CSV、glob 通配符或分区目录，多个文件由 workers 个线程并行读取。
+    chunksize 为 None 时，总大小超过 STREAMING_MIN_SIZE 的数据源自动改为分块流式读取。
+    类型校验失败而被拒绝的行记录到 report（schema.ValidationReport），命中缓存时不会重新校验。
+    """
+    files = sources.resolve(source)
+    root = sources.root_directory(source)
+    # 单个 CSV 的缓存放在文件旁边，多文件数据源的缓存放在根目录下
+    cache_base = files[0] if files == [os.path.abspath(source)] else os.path.join(root, '.dataset')
+
+    params = {'threshold': threshold}
+    if use_cache and dataset_cache.is_valid(cache_base, files, params):
+        return dataset_cache.load(cache_base)
+
+    # 先计算缓存键再读取，读取期间源文件若被修改，下次启动会重新构建
+    key = dataset_cache.source_key(files, params) if use_cache else None
+    if chunksize is None and sum(os.path.getsize(f) for f in files) > STREAMING_MIN_SIZE:
+        chunksize = DEFAULT_CHUNKSIZE
+    if chunksize:
+        # streaming 依赖本模块的列定义，在此处导入以避免循环导入
+        from .streaming import stream_dataset
+        data = stream_dataset(files, root, threshold, chunksize, report)
+    else:
+        # 数值列解析时即为 float32，清洗后只保留紧凑副本，原始数据随即释放
+        data = compact(remove_outliers(_prepare(sources.read_files(files, root, workers, report)), threshold))
+    if use_cache:
+        dataset_cache.save(cache_base, data, key)
+    return data
+
+
+class CropDataset:
+    """ 按作物种类分块连续存储的训练数据
+
+    构建时按作物排序一次，并记录每种作物的起止偏移；
+    之后取单个作物的 X / y 只是 numpy 切片，不再扫描整列。
+    """
+
+    def __init__(self, crops, features, target, offsets):
+        self.features = np.ascontiguousarray(features, dtype='float32')
+        self.target = np.ascontiguousarray(target, dtype='float32')
+        self.offsets = np.asarray(offsets, dtype='int64')
+        counts = np.diff(self.offsets)
+        self._index = {crop: i for i, crop in enumerate(crops) if counts[i] > 0}
+        # 数据构建后不再修改，摘要计算一次后缓存
+        self._fingerprints = {}
+
+    @classmethod
+    def from_frame(cls, data):
+        """ 由 load_dataset 返回的紧凑数据集构建 """
+        crops = data[CROP_COLUMN].cat.categories
+        codes = data[CROP_COLUMN].cat.codes.to_numpy()
+        features = data[FEATURE_COLUMNS].to_numpy(dtype='float32')
+        target = data[TARGET_COLUMN].to_numpy(dtype='float32')
+
+        # 内存中清洗的结果已按作物排序，此时无需重排
+        if len(codes) > 1 and (np.diff(codes) < 0).any():
+            order = np.argsort(codes, kind='stable')
+            codes, features, target = codes[order], features[order], target[order]
+
+        # 作物种类缺失的编码为 -1，排在最前面，不属于任何作物
+        counts = np.bincount(codes[codes >= 0], minlength=len(crops))
+        offsets = np.concatenate([[0], np.cumsum(counts)]) + np.count_nonzero(codes < 0)
+        return cls(list(crops), features, target, offsets)
+
+    @classmethod
+    def from_blocks(cls, blocks):
+        """ 由 {作物种类: (特征, 产量)} 构建，作物按名称排序 """
+        crops = sorted(blocks)
+        counts = [len(blocks[crop][1]) for crop in crops]
+        features = np.concatenate([blocks[crop][0] for crop in crops]) if crops else np.zeros((0, len(FEATURE_COLUMNS)))
+        target = np.concatenate([blocks[crop][1] for crop in crops]) if crops else np.zeros(0)
+        return cls(crops, features, target, np.concatenate([[0], np.cumsum(counts)]))
+
+    @property
+    def crops(self):
+        """ 有数据的作物种类（按名称排序） """
+        return list(self._index)
+
+    @property
+    def nbytes(self):
+        return self.features.nbytes + self.target.nbytes + self.offsets.nbytes
+
+    def __contains__(self, crop):
+        return crop in self._index
+
+    def __len__(self):
+        return int(self.offsets[-1] - self.offsets[0])
+
+    def arrays(self, crop):
+        """ 返回指定作物的特征和产量数组，均为视图 """
+        i = self._index[crop]
+        start, stop = self.offsets[i], self.offsets[i + 1]
+        return self.features[start:stop], self.target[start:stop]
+
+    def all_rows(self):
+        """ 返回所有属于某种作物的行的特征、产量（均为视图）和每行作物在 crops 中的编号 """
+        counts = np.diff(self.offsets)[list(self._index.values())]
+        codes = np.repeat(np.arange(len(counts), dtype='int32'), counts)
+        start, stop = self.offsets[0], self.offsets[-1]
+        return self.features[start:stop], self.target[start:stop], codes
+
+    def fingerprint(self, crop=None):
+        """ 指定作物训练数据的摘要，crop 为 None 时为全部数据（含作物列表）的摘要 """
+        if crop not in self._fingerprints:
+            if crop is None:
+                arrays = self.all_rows() + (np.array(self.crops, dtype=str),)
+            else:
+                arrays = self.arrays(crop)
+            self._fingerprints[crop] = data_fingerprint(*arrays)
+        return self._fingerprints[crop]
+
+    def slice(self, crop):
+        """ 返回指定作物的特征 DataFrame 和产量，均为底层数组的视图 """
+        features, target = self.arrays(crop)
+        return pd.DataFrame(features, columns=FEATURE_COLUMNS, copy=False), target
@@ -0,0 +1,146 @@
+# coding: utf-8
+import hashlib
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+
+# 缓存格式变化时递增，旧缓存会被自动重建
+CACHE_VERSION = 4
+
+
+def cache_paths(cache_base):
+    """ 返回缓存数据文件和缓存键文件的路径
+
+    单个 CSV 以文件本身为 cache_base，缓存放在它旁边；多文件数据源以根目录下的固定名字为 cache_base。
+    """
+    return cache_base + '.cache.npz', cache_base + '.cache.json'
+
+
+def content_hash(file_path, block_size=1 << 20):
+    """ 分块计算文件内容的 SHA-256 """
+    digest = hashlib.sha256()
+    with open(file_path, 'rb') as f:
+        for block in iter(lambda: f.read(block_size), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def source_key(files, params):
+    """ 由每个源文件的路径、大小、修改时间、内容哈希以及清洗参数组成的缓存键 """
+    entries = []
+    for file_path in files:
+        stat = os.stat(file_path)
+        entries.append({
+            'path': file_path,
+            'size': stat.st_size,
+            'mtime_ns': stat.st_mtime_ns,
+            'sha256': content_hash(file_path),
+        })
+    return {'version': CACHE_VERSION, 'files': entries, 'params': params}
+
+
+def _read_key(key_path):
+    try:
+        with open(key_path, encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _write_atomic(path, write):
+    """ 先写入临时文件再替换，避免中途退出留下损坏的缓存 """
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'wb') as f:
+        write(f)
+    os.replace(tmp_path, path)
+
+
+def _write_key(key_path, key):
+    _write_atomic(key_path, lambda f: f.write(json.dumps(key, ensure_ascii=False, indent=4).encode('utf-8')))
+
+
+def is_valid(cache_base, files, params):
+    """ 判断缓存是否仍对应当前的源文件和清洗参数
+
+    文件列表相同且大小和修改时间都一致时直接命中；仅修改时间变化的文件再比较内容哈希，
+    内容未变则刷新缓存键中的修改时间，不必重建。
+    """
+    data_path, key_path = cache_paths(cache_base)
+    key = _read_key(key_path)
+    if key is None or not os.path.exists(data_path):
+        return False
+    if key.get('version') != CACHE_VERSION or key.get('params') != params:
+        return False
+    entries = key.get('files', [])
+    if [entry['path'] for entry in entries] != list(files):
+        return False
+
+    touched = False
+    for entry in entries:
+        stat = os.stat(entry['path'])
+        if entry['size'] != stat.st_size:
+            return False
+        if entry['mtime_ns'] == stat.st_mtime_ns:
+            continue
+        if entry['sha256'] != content_hash(entry['path']):
+            return False
+        entry['mtime_ns'] = stat.st_mtime_ns
+        touched = True
+
+    if touched:
+        try:
+            _write_key(key_path, key)
+        except OSError:
+            pass
+    return True
+
+
+def load(cache_base):
+    """ 从缓存读取清洗后的数据 """
+    data_path, key_path = cache_paths(cache_base)
+    with np.load(data_path, allow_pickle=False) as arrays:
+        columns = json.loads(str(arrays['columns']))
+        data = {}
+        for i, (column, kind) in enumerate(columns):
+            if kind == 'numeric':
+                data[column] = arrays[f'column_{i}']
+                continue
+            # 分类列和文本列以整数编码和类别表保存，-1 表示缺失值
+            values = pd.Categorical.from_codes(arrays[f'column_{i}'], arrays[f'categories_{i}'])
+            data[column] = values if kind == 'category' else np.asarray(values, dtype=object)
+        columns = [column for column, _ in columns]
+        index = arrays['index'] if 'index' in arrays else None
+        return pd.DataFrame(data, index=index, columns=columns)
+
+
+def save(cache_base, data, key):
+    """ 将清洗后的数据写入缓存；源文件所在目录不可写时静默跳过 """
+    data_path, key_path = cache_paths(cache_base)
+    columns = []
+    arrays = {}
+    if not isinstance(data.index, pd.RangeIndex):
+        arrays['index'] = data.index.to_numpy()
+    for i, column in enumerate(data.columns):
+        values = data[column]
+        if isinstance(values.dtype, pd.CategoricalDtype):
+            columns.append((column, 'category'))
+            arrays[f'column_{i}'] = values.cat.codes.to_numpy()
+            arrays[f'categories_{i}'] = values.cat.categories.to_numpy(dtype=str)
+        elif pd.api.types.is_numeric_dtype(values):
+            columns.append((column, 'numeric'))
+            arrays[f'column_{i}'] = values.to_numpy()
+        else:
+            columns.append((column, 'object'))
+            codes, categories = pd.factorize(values)
+            arrays[f'column_{i}'] = codes
+            arrays[f'categories_{i}'] = categories.to_numpy(dtype=str)
+    arrays['columns'] = np.array(json.dumps(columns, ensure_ascii=False))
+
+    try:
+        _write_atomic(data_path, lambda f: np.savez(f, **arrays))
+        _write_key(key_path, key)
+    except OSError:
+        pass
@@ -0,0 +1,164 @@
+# coding: utf-8
+import time
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+
+import numpy as np
+import pandas as pd
+from sklearn.metrics import mean_absolute_error, mean_squared_error, r2_score
+from sklearn.model_selection import KFold
+
+from .dataset import FEATURE_COLUMNS
+from .json_store import JsonStore
+from .training import POLL_INTERVAL, crop_fingerprint, crop_model
+
+
+# 交叉验证的折数和划分的随机种子
+DEFAULT_FOLDS = 5
+FOLD_SEED = 42
+# 评估指标，R2 即 sklearn 回归模型 score 给出的决定系数（准确度）
+METRICS = ["MSE", "MAE", "R2"]
+
+
+class EvaluationResults(JsonStore):
+    """ 按 (模型类型, 作物) 缓存交叉验证结果，保存在模型目录下的 evaluation.json
+
+    每条记录带有评估时的模型指纹（见 training.crop_fingerprint）和折数，
+    训练数据、超参数或折数变化后记录失效，下次评估时重新计算。
+    """
+
+    FILENAME = 'evaluation.json'
+
+    def get(self, model_type, crop, fingerprint, folds):
+        """ 指纹和折数都一致时返回缓存的记录，否则返回 None """
+        entry = self._load().get(model_type, {}).get(str(crop))
+        if entry and entry['fingerprint'] == fingerprint and entry['folds'] == folds:
+            return entry
+        return None
+
+    def put(self, model_type, crop, entry):
+        with self._lock:
+            entries = {key: dict(crops) for key, crops in self._load().items()}
+            entries.setdefault(model_type, {})[str(crop)] = entry
+            self._save(entries)
+
+
+def fold_scores(model_dir, model_type, crop, features, target, folds, fold, n_jobs=None):
+    """ 训练并评估第 fold 折，返回 (各指标, 耗时)，在子进程中运行 """
+    start = time.perf_counter()
+    train, test = list(KFold(n_splits=folds, shuffle=True, random_state=FOLD_SEED).split(features))[fold]
+    model = crop_model(model_dir, model_type, crop, n_jobs)
+    model.fit(pd.DataFrame(features[train], columns=FEATURE_COLUMNS), target[train])
+    predicted = model.predict(pd.DataFrame(features[test], columns=FEATURE_COLUMNS))
+    scores = {
+        "MSE": float(mean_squared_error(target[test], predicted)),
+        "MAE": float(mean_absolute_error(target[test], predicted)),
+        "R2": float(r2_score(target[test], predicted)),
+    }
+    return scores, time.perf_counter() - start
+
+
+def crop_scores(model_dir, model_types, crop, features, target, folds, n_jobs=None):
+    """ 依次评估各模型类型的全部折，返回 {模型类型: 各折的 (各指标, 耗时)}
+
+    作为一个子进程任务运行，该作物的数据只传输一次。
+    """
+    return {model_type: [fold_scores(model_dir, model_type, crop, features, target, folds, fold, n_jobs)
+                         for fold in range(folds)]
+            for model_type in model_types}
+
+
+def _summarize(fold_results, fingerprint, folds, rows):
+    """ 合并各折的结果：指标取平均值，另记录 MSE 的标准差和总耗时 """
+    entry = {metric: float(np.mean([scores[metric] for scores, _ in fold_results])) for metric in METRICS}
+    entry.update({
+        'MSE_std': float(np.std([scores["MSE"] for scores, _ in fold_results])),
+        'fingerprint': fingerprint,
+        'folds': folds,
+        'rows': int(rows),
+        'seconds': round(sum(seconds for _, seconds in fold_results), 3),
+        'evaluated_at': time.strftime('%Y-%m-%d %H:%M:%S'),
+    })
+    return entry
+
+
+def evaluate(dataset, model_dir, model_types, folds=DEFAULT_FOLDS, workers=1, progress=None, cancel=None):
+    """ 对每种作物的每种模型类型做 k 折交叉验证，返回 {(作物, 模型类型): 记录}
+
+    指纹未变化的组合直接使用 EvaluationResults 中的缓存；其余组合按作物合并为任务（见 crop_scores，
+    作物数据只向子进程传输一次），由 workers 个进程并行训练和评估，完成的组合立即写入缓存。
+    progress(已完成折数, 总折数) 在单进程时每完成一折调用一次，多进程时在一种作物的任务完成后为其每个组合各调用一次。
+    cancel（threading.Event）被设置后不再开始新的折或作物，已完成的组合保留在缓存中，
+    返回值只包含已完成的组合。行数少于 2 的作物不参与评估。
+    """
+    store = EvaluationResults(model_dir)
+    results = {}
+    tasks = {}
+    for crop in dataset.crops:
+        rows = len(dataset.arrays(crop)[1])
+        if rows < 2:
+            continue
+        digest = dataset.fingerprint(crop)
+        for model_type in model_types:
+            fingerprint = crop_fingerprint(model_dir, model_type, crop, digest)
+            cached = store.get(model_type, crop, fingerprint, min(folds, rows))
+            if cached is not None:
+                results[(crop, model_type)] = cached
+            else:
+                tasks[(crop, model_type)] = (fingerprint, min(folds, rows))
+
+    total = sum(k for _, k in tasks.values())
+    done = 0
+    fold_results = {key: [] for key in tasks}
+
+    def collect(key, folds_done):
+        nonlocal done
+        fold_results[key].extend(folds_done)
+        fingerprint, k = tasks[key]
+        if len(fold_results[key]) == k:
+            crop, model_type = key
+            results[key] = _summarize(fold_results[key], fingerprint, k, len(dataset.arrays(crop)[1]))
+            store.put(model_type, crop, results[key])
+        done += len(folds_done)
+        if progress is not None:
+            progress(done, total)
+
+    if workers <= 1:
+        for (crop, model_type), (_, k) in tasks.items():
+            for fold in range(k):
+                if cancel is not None and cancel.is_set():
+                    return results
+                scores = fold_scores(model_dir, model_type, crop, *dataset.arrays(crop), k, fold)
+                collect((crop, model_type), [scores])
+        return results
+
+    jobs = {}
+    for crop, model_type in tasks:
+        jobs.setdefault(crop, []).append(model_type)
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        # 数据多的作物先提交；每个模型只用一个线程，避免线程数超过核心数
+        order = sorted(jobs, key=lambda crop: len(dataset.arrays(crop)[1]) * len(jobs[crop]), reverse=True)
+        pending = {pool.submit(crop_scores, model_dir, jobs[crop], crop, *dataset.arrays(crop),
+                               tasks[(crop, jobs[crop][0])][1], 1): crop for crop in order}
+        while pending:
+            done_futures, _ = wait(pending, timeout=POLL_INTERVAL, return_when=FIRST_COMPLETED)
+            for future in done_futures:
+                crop = pending.pop(future)
+                if not future.cancelled():
+                    for model_type, scores in future.result().items():
+                        collect((crop, model_type), scores)
+            if cancel is not None and cancel.is_set():
+                for future in pending:
+                    future.cancel()
+    return results
+
+
+def best_model_types(results, metric="MSE"):
+    """ 每种作物在指定指标上最好的模型类型：R2 越大越好，误差越小越好 """
+    best = {}
+    for (crop, model_type), entry in results.items():
+        if crop in best:
+            score = best[crop][1]
+            if (entry[metric] <= score) if metric == "R2" else (entry[metric] >= score):
+                continue
+        best[crop] = (model_type, entry[metric])
+    return {crop: model_type for crop, (model_type, _) in best.items()}
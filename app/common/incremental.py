@@ -0,0 +1,134 @@
+# coding: utf-8
+import io
+import os
+
+import numpy as np
+import pandas as pd
+
+from . import schema, sources
+from .dataset import (COLUMN_MAP, FEATURE_COLUMNS, TARGET_COLUMN, ZSCORE_THRESHOLD, DEFAULT_CHUNKSIZE,
+                      CropDataset)
+from .json_store import JsonStore
+from .streaming import CropStats, RowHashes, read_chunks, crop_rows
+from .training import MODEL_TYPES
+
+
+class DirtyModels(JsonStore):
+    """ 数据更新后需要重新训练的 (模型类型, 作物) 组合，保存在模型目录下的 dirty.json """
+
+    FILENAME = 'dirty.json'
+
+    def pairs(self):
+        return {tuple(pair) for pair in self._load()}
+
+    def _save(self, pairs):
+        super()._save(sorted(pairs))
+
+    def mark(self, crops, model_types=MODEL_TYPES):
+        """ 把指定作物在各模型类型下的模型标记为过期 """
+        with self._lock:
+            pairs = self.pairs()
+            pairs.update((model_type, crop) for model_type in model_types for crop in crops)
+            self._save(pairs)
+
+    def clear(self, model_type, crop):
+        """ 模型重新训练后清除标记 """
+        with self._lock:
+            pairs = self.pairs()
+            if (model_type, crop) in pairs:
+                pairs.discard((model_type, crop))
+                self._save(pairs)
+
+    def clear_type(self, model_type):
+        """ 全局模型重新训练后清除该模型类型下所有作物的标记 """
+        with self._lock:
+            pairs = self.pairs()
+            remaining = {pair for pair in pairs if pair[0] != model_type}
+            if remaining != pairs:
+                self._save(remaining)
+
+    def is_dirty(self, model_type, crop):
+        return (model_type, crop) in self.pairs()
+
+    def has_type(self, model_type):
+        """ 该模型类型下是否有任何作物的模型过期 """
+        return any(pair[0] == model_type for pair in self.pairs())
+
+
+def _ends_with_newline(path):
+    with open(path, 'rb') as f:
+        f.seek(-1, os.SEEK_END)
+        return f.read(1) == b'\n'
+
+
+class DatasetAppender:
+    """ 向已清洗的数据集增量追加记录
+
+    新记录写入数据源的末尾；去重哈希和每种作物的 z-score 统计量在内存中增量更新，
+    只重新过滤受影响作物的数据，不需要重新读取和清洗整个文件。
+    边界移动后不再属于异常值的历史行不会被找回，源文件变化使缓存失效，
+    下次启动时会按完整的源文件重新清洗。
+    """
+
+    def __init__(self, source, threshold=ZSCORE_THRESHOLD):
+        self.source = source
+        self.root = sources.root_directory(source)
+        self.threshold = threshold
+        self.stats = None
+        self.hashes = None
+
+    def target_file(self):
+        """ 新记录写入的文件：单个 CSV 为其本身，通配符为最后一个匹配的文件，目录为根目录下的 appended.csv """
+        if os.path.isdir(self.source):
+            return os.path.join(self.root, 'appended.csv')
+        return sources.resolve(self.source)[-1]
+
+    def _scan_source(self):
+        """ 首次追加时扫描一遍数据源，得到已有行的哈希和每种作物的统计量 """
+        self.stats, self.hashes = CropStats(), RowHashes()
+        for chunk in read_chunks(sources.resolve(self.source), self.root, DEFAULT_CHUNKSIZE):
+            first = self.hashes.first_occurrences(chunk)
+            _, crops, values = crop_rows(chunk, first)
+            self.stats.update(crops, values)
+
+    def append(self, dataset, rows):
+        """ 追加使用源文件列名 (Rainfall/Temperature/Ph/Crop/Production) 的记录
+
+        返回更新后的 CropDataset 和新增数据涉及的作物种类。
+        """
+        if self.stats is None:
+            self._scan_source()
+
+        # 按目标文件的列顺序写入末尾，新建的文件使用标准列名；rows 中没有的列留空，多余的列忽略
+        target = self.target_file()
+        exists = os.path.exists(target) and os.path.getsize(target) > 0
+        columns = pd.read_csv(target, nrows=0).columns if exists else list(COLUMN_MAP)
+        text = rows.reindex(columns=columns).to_csv(index=False)
+        with open(target, 'a', encoding='utf-8', newline='') as f:
+            if exists:
+                # 源文件末尾没有换行时先补上，否则最后一行会和第一条新记录连在一起
+                f.write(text.partition('\n')[2] if _ends_with_newline(target) else '\n' + text.partition('\n')[2])
+            else:
+                f.write(text)
+
+        # 用写入的文本按 SCHEMA 重新解析，使去重哈希与之后整体读取数据源时的数值完全一致
+        rows = schema.read_file(io.StringIO(text))
+        rows = sources.add_partitions(rows, sources.partition_values(target, self.root)).rename(columns=COLUMN_MAP)
+        new_rows, crops, values = crop_rows(rows, self.hashes.first_occurrences(rows))
+        if not len(new_rows):
+            return dataset, []
+        self.stats.update(crops, values)
+        affected = sorted(pd.unique(crops))
+
+        # 未受影响的作物沿用原有数据块，受影响的作物用新的边界重新过滤
+        blocks = {crop: dataset.arrays(crop) for crop in dataset.crops}
+        empty = (np.zeros((0, len(FEATURE_COLUMNS)), dtype='float32'), np.zeros(0, dtype='float32'))
+        for crop in affected:
+            features, target = blocks.get(crop, empty)
+            added = new_rows[crops == crop]
+            features = np.concatenate([features, added[FEATURE_COLUMNS].to_numpy(dtype='float32')])
+            target = np.concatenate([target, added[TARGET_COLUMN].to_numpy(dtype='float32')])
+            values = np.column_stack([features, target]).astype('float64')
+            keep = self.stats.keep_mask(np.full(len(target), crop, dtype=object), values, self.threshold)
+            blocks[crop] = (features[keep], target[keep])
+        return CropDataset.from_blocks(blocks), affected
@@ -0,0 +1,45 @@
+# coding: utf-8
+import json
+import os
+import threading
+
+from .model_cache import file_stamp
+
+
+class JsonStore:
+    """ 保存在模型目录下单个 JSON 文件中的记录，文件名由子类的 FILENAME 指定
+
+    训练、调优、评估线程和界面线程可能同时读写同一个文件，读-改-写须在 _lock 内进行（所有子类共用一个锁）。
+    写入先写临时文件再替换，中断时不会留下损坏的文件；文件不存在或已损坏时按空记录读取。
+    解析结果按文件的修改时间缓存，查询只需一次 stat；_load 返回的是缓存的对象，修改前须先复制。
+    """
+
+    FILENAME = None
+    _lock = threading.Lock()
+    # 路径 -> (file_stamp, 内容)
+    _parsed = {}
+
+    def __init__(self, model_dir):
+        self.model_dir = model_dir
+        self.path = os.path.join(model_dir, self.FILENAME)
+
+    def _load(self):
+        stamp = file_stamp(self.path)
+        cached = self._parsed.get(self.path)
+        if cached is not None and cached[0] == stamp:
+            return cached[1]
+        try:
+            with open(self.path, encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            data = {}
+        self._parsed[self.path] = (stamp, data)
+        return data
+
+    def _save(self, data):
+        """ 在 _lock 内调用；同时更新解析缓存，同一时间刻度内大小相同的两次写入不会读到旧内容 """
+        tmp_path = self.path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(data, f, ensure_ascii=False, indent=4)
+        os.replace(tmp_path, self.path)
+        self._parsed[self.path] = (file_stamp(self.path), data)
@@ -0,0 +1,72 @@
+# coding: utf-8
+import os
+import threading
+from collections import OrderedDict
+
+
+# 默认最多缓存的模型数和总字节数
+MAX_MODELS = 16
+MAX_BYTES = 512 * 1024 ** 2
+
+
+def file_stamp(path):
+    """ 文件的 (修改时间, 大小)，文件不存在时返回 None，文件被重写后随之变化 """
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return stat.st_mtime_ns, stat.st_size
+
+
+class ModelCache:
+    """ 已加载模型的 LRU 缓存，按模型数和字节数限制，超出任一上限时淘汰最久未使用的模型
+
+    每个模型带有一个版本标记（通常包含模型文件的 file_stamp），读取时标记不一致即视为失效并移除。
+    模型占用的内存由调用方给出（见 storage.memory_size），单个超过字节上限的模型不缓存。
+    """
+
+    def __init__(self, max_models=MAX_MODELS, max_bytes=MAX_BYTES):
+        self.max_models = max_models
+        self.max_bytes = max_bytes
+        self.nbytes = 0
+        self._entries = OrderedDict()  # 键 -> (版本标记, 模型, 字节数)，最近使用的在末尾
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key, stamp):
+        """ 返回版本标记一致的模型，没有或已失效时返回 None """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry[0] != stamp:
+                self._remove(key)
+                return None
+            self._entries.move_to_end(key)
+            return entry[1]
+
+    def put(self, key, stamp, model, nbytes):
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            if nbytes > self.max_bytes:
+                return
+            self._entries[key] = (stamp, model, nbytes)
+            self.nbytes += nbytes
+            while len(self._entries) > self.max_models or self.nbytes > self.max_bytes:
+                self._remove(next(iter(self._entries)))
+
+    def invalidate(self, key):
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.nbytes = 0
+
+    def _remove(self, key):
+        self.nbytes -= self._entries.pop(key)[2]
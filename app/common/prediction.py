@@ -0,0 +1,116 @@
+# coding: utf-8
+import time
+
+import pandas as pd
+
+from . import storage
+from .dataset import FEATURE_COLUMNS
+from .incremental import DirtyModels
+from .model_cache import ModelCache, file_stamp
+from .registry import ModelRegistry
+from .training import (crop_fingerprint, crop_model, global_fingerprint, model_fingerprint, model_path,
+                       params_fingerprint, save_model)
+from .tuned_params import TunedParams
+
+
+# 进程内共享的已加载模型，连续预测时直接复用，不再从磁盘反序列化
+MODEL_CACHE = ModelCache()
+
+
+class ModelNotTrained(Exception):
+    """ 全局模型没有训练或已过期；全局模型用全部数据训练，耗时较长，须先预训练（train_global），不在预测时训练 """
+
+
+def _cache_stamp(model_dir, filename, data_digest):
+    """ 缓存的模型仍然有效的条件：模型文件、训练数据、调优记录和过期标记都没有变化
+
+    只需几次 stat 和一次已缓存摘要的查找，不必重新计算指纹。
+    """
+    return (file_stamp(filename), data_digest, file_stamp(TunedParams(model_dir).path),
+            file_stamp(DirtyModels(model_dir).path))
+
+
+def _remember(cache, key, model_dir, filename, data_digest, model):
+    if cache is not None:
+        cache.put(key, _cache_stamp(model_dir, filename, data_digest), model, storage.memory_size(model))
+    return model
+
+
+def load_crop_model(model_dir, dataset, model_type, crop, cache=MODEL_CACHE, mode=storage.DEFAULT_MODE):
+    """ 返回该作物的最新模型：指纹一致时按登记的存储方式从文件加载，否则用当前数据重新训练并按 mode 保存
+
+    cache（ModelCache）中仍然有效的模型直接返回；cache 为 None 时每次都检查指纹并从文件加载。
+    """
+    # 模型文件的位置由索引给出，没有记录时按 model_path 保存新训练的模型
+    registry = ModelRegistry(model_dir)
+    filename = registry.filename(model_type, crop)
+    key = (model_dir, model_type, crop)
+    data_digest = dataset.fingerprint(crop)
+    if filename is not None and cache is not None:
+        model = cache.get(key, _cache_stamp(model_dir, filename, data_digest))
+        if model is not None:
+            return model
+
+    dirty_models = DirtyModels(model_dir)
+    fingerprint = crop_fingerprint(model_dir, model_type, crop, data_digest)
+    if filename is not None and not registry.is_stale(model_type, crop, fingerprint) \
+            and not dirty_models.is_dirty(model_type, crop):
+        try:
+            model = storage.load(filename, registry.storage(model_type, crop))
+            return _remember(cache, key, model_dir, filename, data_digest, model)
+        except FileNotFoundError:
+            # 模型文件被手动删除，索引中的记录已失效
+            registry.remove(model_type, crop)
+
+    # 训练数据或超参数变化后模型已过期，优先使用该作物调优得到的超参数重新训练；
+    # 模型文件将被重写，先释放缓存中的旧模型
+    if cache is not None:
+        cache.invalidate(key)
+    filename = model_path(model_dir, model_type, crop)
+    X, y = dataset.slice(crop)
+    model = crop_model(model_dir, model_type, crop)
+    fingerprint = model_fingerprint(data_digest, model)
+    params = params_fingerprint(model)
+    start = time.perf_counter()
+    model.fit(X, y)
+    saved_mode = save_model(model, filename, mode)
+    registry.record(model_type, crop, filename, fingerprint, len(y), time.perf_counter() - start, saved_mode, params)
+    dirty_models.clear(model_type, crop)
+    return _remember(cache, key, model_dir, filename, data_digest, model)
+
+
+def load_global_model(model_dir, dataset, model_type, cache=MODEL_CACHE):
+    """ 返回最新的全局模型，没有训练或任何作物的数据、超参数变化后抛出 ModelNotTrained """
+    registry = ModelRegistry(model_dir)
+    filename = registry.filename(model_type, None)
+    key = (model_dir, model_type, None)
+    data_digest = dataset.fingerprint()
+    if filename is not None and cache is not None:
+        model = cache.get(key, _cache_stamp(model_dir, filename, data_digest))
+        if model is not None:
+            return model
+
+    dirty_models = DirtyModels(model_dir)
+    if filename is not None and not dirty_models.has_type(model_type) and \
+            not registry.is_stale(model_type, None, global_fingerprint(model_type, dataset)):
+        try:
+            model = storage.load(filename, registry.storage(model_type, None))
+            return _remember(cache, key, model_dir, filename, data_digest, model)
+        except FileNotFoundError:
+            registry.remove(model_type, None)
+    raise ModelNotTrained(model_type)
+
+
+def predict_yield(model_dir, dataset, model_type, crop, rainfall, temperature, ph_value, layout="PerCrop",
+                  cache=MODEL_CACHE, mode=storage.DEFAULT_MODE):
+    """ 预测一组输入的产量，作物的模型不存在或已过期时先训练，新模型按存储方式 mode 保存
+
+    layout 为 "Global" 时使用所有作物共用的全局模型，全局模型须已预训练，否则抛出 ModelNotTrained。
+    作物不在数据集中时抛出 KeyError。
+    """
+    if crop not in dataset:
+        raise KeyError("无效的作物种类")
+    input_data = pd.DataFrame([[rainfall, temperature, ph_value]], columns=FEATURE_COLUMNS)
+    if layout == "Global":
+        return load_global_model(model_dir, dataset, model_type, cache).predict(input_data, crop)[0]
+    return load_crop_model(model_dir, dataset, model_type, crop, cache, mode).predict(input_data)[0]
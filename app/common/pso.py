@@ -0,0 +1,260 @@
+# coding: utf-8
+import json
+import math
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+
+import numpy as np
+import pandas as pd
+from sklearn.model_selection import KFold
+
+from .dataset import FEATURE_COLUMNS, data_fingerprint
+from .training import POLL_INTERVAL, TrainingCancelled, build_model, fit_model
+
+
+# 各优化模型的搜索空间：参数名 -> (下界, 上界, 取值方式)
+# int 在区间内取整数，float 线性取值，log 按对数均匀取值
+SEARCH_SPACES = {
+    "DecisionTreeOptimized": {
+        'max_depth': (2, 40, 'int'),
+        'min_samples_split': (2, 20, 'int'),
+        'min_samples_leaf': (1, 20, 'int'),
+    },
+    "XGBoostOptimized": {
+        'n_estimators': (50, 500, 'int'),
+        'max_depth': (2, 12, 'int'),
+        'min_child_weight': (1, 10, 'int'),
+        'learning_rate': (0.01, 0.3, 'log'),
+    },
+}
+
+CHECKPOINT_VERSION = 2
+
+
+def decode(space, positions):
+    """ 把 [0, 1] 归一化空间中的位置转换为超参数字典 """
+    params = []
+    for position in np.atleast_2d(positions):
+        values = {}
+        for x, (name, (low, high, kind)) in zip(position, space.items()):
+            if kind == 'log':
+                values[name] = float(math.exp(math.log(low) + x * (math.log(high) - math.log(low))))
+            elif kind == 'int':
+                values[name] = int(round(low + x * (high - low)))
+            else:
+                values[name] = float(low + x * (high - low))
+        params.append(values)
+    return params
+
+
+class Swarm:
+    """ 粒子群的状态，位置和速度保存在 [0, 1]^d 的归一化空间中，所有粒子一次性向量化更新 """
+
+    def __init__(self, dims, particles=20, inertia=0.7, cognitive=1.5, social=1.5, seed=42):
+        self.inertia = inertia
+        self.cognitive = cognitive
+        self.social = social
+        self.rng = np.random.default_rng(seed)
+        self.positions = self.rng.random((particles, dims))
+        # 速度上限为搜索范围的 20%，避免粒子在边界之间来回跳动
+        self.max_velocity = 0.2
+        self.velocities = self.rng.uniform(-self.max_velocity, self.max_velocity, (particles, dims))
+        self.best_positions = self.positions.copy()
+        self.best_scores = np.full(particles, np.inf)
+        self.iteration = 0
+
+    @property
+    def best(self):
+        """ 全局最优的 (位置, 得分) """
+        index = int(np.argmin(self.best_scores))
+        return self.best_positions[index], float(self.best_scores[index])
+
+    def step(self, scores):
+        """ 记录当前位置的得分（越小越好），然后移动所有粒子 """
+        improved = scores < self.best_scores
+        self.best_positions[improved] = self.positions[improved]
+        self.best_scores[improved] = scores[improved]
+
+        global_best, _ = self.best
+        r1 = self.rng.random(self.positions.shape)
+        r2 = self.rng.random(self.positions.shape)
+        self.velocities = (self.inertia * self.velocities
+                           + self.cognitive * r1 * (self.best_positions - self.positions)
+                           + self.social * r2 * (global_best - self.positions))
+        np.clip(self.velocities, -self.max_velocity, self.max_velocity, out=self.velocities)
+        self.positions = np.clip(self.positions + self.velocities, 0, 1)
+        self.iteration += 1
+
+    def state(self):
+        return {
+            'inertia': self.inertia, 'cognitive': self.cognitive, 'social': self.social,
+            'max_velocity': self.max_velocity, 'iteration': self.iteration,
+            'positions': self.positions.tolist(), 'velocities': self.velocities.tolist(),
+            'best_positions': self.best_positions.tolist(),
+            # JSON 不支持 inf，未评估过的粒子记为 None
+            'best_scores': [None if math.isinf(score) else float(score) for score in self.best_scores],
+            'rng': self.rng.bit_generator.state,
+        }
+
+    @classmethod
+    def from_state(cls, state):
+        swarm = cls.__new__(cls)
+        swarm.inertia = state['inertia']
+        swarm.cognitive = state['cognitive']
+        swarm.social = state['social']
+        swarm.max_velocity = state['max_velocity']
+        swarm.iteration = state['iteration']
+        swarm.positions = np.array(state['positions'])
+        swarm.velocities = np.array(state['velocities'])
+        swarm.best_positions = np.array(state['best_positions'])
+        swarm.best_scores = np.array([np.inf if score is None else score for score in state['best_scores']])
+        swarm.rng = np.random.default_rng()
+        swarm.rng.bit_generator.state = state['rng']
+        return swarm
+
+
+def save_checkpoint(path, model_type, space, data_digest, swarm, evaluated):
+    """ 每轮迭代后保存粒子群状态和训练数据的指纹，先写临时文件再替换，中断时不会留下损坏的文件 """
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    checkpoint = {
+        'version': CHECKPOINT_VERSION,
+        'model_type': model_type,
+        'space': {name: list(bounds) for name, bounds in space.items()},
+        'data': data_digest,
+        'swarm': swarm.state(),
+        'evaluated': [[params, score] for params, score in evaluated.values()],
+    }
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(checkpoint, f, ensure_ascii=False)
+    os.replace(tmp_path, path)
+
+
+def load_checkpoint(path, model_type, space, data_digest):
+    """ 读取检查点，模型类型、搜索空间或训练数据不一致时返回 None，重新开始搜索
+
+    已评估的得分是在保存检查点时的数据上算出的，数据变化（如追加了新的行）后不能沿用
+    """
+    try:
+        with open(path, encoding='utf-8') as f:
+            checkpoint = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if (checkpoint.get('version') != CHECKPOINT_VERSION or checkpoint.get('model_type') != model_type
+            or checkpoint.get('space') != {name: list(bounds) for name, bounds in space.items()}
+            or checkpoint.get('data') != data_digest):
+        return None
+    evaluated = {_params_key(params): (params, score) for params, score in checkpoint['evaluated']}
+    return Swarm.from_state(checkpoint['swarm']), evaluated
+
+
+def _params_key(params):
+    return tuple(sorted(params.items()))
+
+
+# 子进程中的训练数据，由进程池的 initializer 设置，每个进程只传输一次
+_worker_data = None
+
+
+def _init_worker(model_type, features, target, folds, seed, cancel=None):
+    global _worker_data
+    _worker_data = (model_type, pd.DataFrame(features, columns=FEATURE_COLUMNS), target, folds, seed, cancel)
+
+
+def cv_score(model_type, params, X, y, folds=3, seed=42, n_jobs=None, cancelled=None):
+    """ k 折交叉验证的平均 MSE，cancelled() 为真时在当前一批树或一轮提升结束时停止并返回 None """
+    scores = []
+    for train, test in KFold(n_splits=folds, shuffle=True, random_state=seed).split(X):
+        model = build_model(model_type, n_jobs, params)
+        try:
+            fit_model(model, X.iloc[train], y[train], cancelled=cancelled)
+        except TrainingCancelled:
+            return None
+        scores.append(np.mean((model.predict(X.iloc[test]) - y[test]) ** 2))
+    return float(np.mean(scores))
+
+
+def _evaluate(params, deadline):
+    model_type, X, y, folds, seed, cancel = _worker_data
+
+    def cancelled():
+        return (deadline is not None and time.time() > deadline) or (cancel is not None and cancel.is_set())
+
+    return cv_score(model_type, params, X, y, folds, seed, n_jobs=1, cancelled=cancelled)
+
+
+def optimize(model_type, features, target, iterations=30, particles=20, workers=1, folds=3,
+             checkpoint=None, progress=None, cancel=None, seed=42, space=None, time_budget=None):
+    """ 用粒子群优化搜索模型的超参数，返回 (最佳超参数, 交叉验证 MSE)
+
+    每轮迭代中整群粒子的交叉验证由 workers 个进程并行计算，相同的超参数只评估一次。
+    指定 checkpoint 时每轮结束后保存状态，再次调用时从中断处继续；检查点记录训练数据的指纹，
+    数据变化后忽略旧的检查点重新搜索，并在第一轮结束时覆盖它。每轮结束调用 progress(迭代次数, 当前最佳 MSE)。
+    cancel（threading.Event）被设置或超过 time_budget 秒后，正在训练的候选在当前一批树或一轮提升结束时停止，
+    不再开始新的评估。被打断的一轮中已完成的评估保存在检查点中，返回已评估过的最优结果；
+    没有完成任何评估时抛出 TimeoutError。
+    """
+    space = space or SEARCH_SPACES[model_type]
+    deadline = time.time() + time_budget if time_budget else None
+    data_digest = data_fingerprint(features, target) if checkpoint else None
+    resumed = load_checkpoint(checkpoint, model_type, space, data_digest) if checkpoint else None
+    swarm, evaluated = resumed or (Swarm(len(space), particles, seed=seed), {})
+
+    pool = manager = None
+    if workers > 1:
+        # 取消请求通过 Manager 的事件转发给子进程
+        manager = multiprocessing.Manager()
+        worker_cancel = manager.Event()
+        pool = ProcessPoolExecutor(max_workers=min(workers, particles), initializer=_init_worker,
+                                   initargs=(model_type, features, target, folds, seed, worker_cancel))
+    else:
+        _init_worker(model_type, features, target, folds, seed, cancel)
+    def stopped():
+        return (cancel is not None and cancel.is_set()) or (deadline is not None and time.time() > deadline)
+
+    try:
+        while swarm.iteration < iterations and not stopped():
+            candidates = decode(space, swarm.positions)
+            new = list({_params_key(params): params for params in candidates
+                        if _params_key(params) not in evaluated}.values())
+            if pool is not None:
+                futures = {pool.submit(_evaluate, params, deadline): params for params in new}
+                pending = set(futures)
+                while pending:
+                    _, pending = wait(pending, timeout=POLL_INTERVAL, return_when=FIRST_COMPLETED)
+                    if stopped():
+                        if cancel is not None and cancel.is_set():
+                            worker_cancel.set()
+                        for future in pending:
+                            future.cancel()
+                results = [(futures[future], future.result()) for future in futures if not future.cancelled()]
+            else:
+                results = []
+                for params in new:
+                    if stopped():
+                        break
+                    results.append((params, _evaluate(params, deadline)))
+            results = [(params, score) for params, score in results if score is not None]
+            for params, score in results:
+                evaluated[_params_key(params)] = (params, score)
+            if len(results) < len(new):
+                # 本轮被打断，粒子不移动，已完成的评估随检查点保存，下次从本轮继续
+                if checkpoint:
+                    save_checkpoint(checkpoint, model_type, space, data_digest, swarm, evaluated)
+                break
+
+            swarm.step(np.array([evaluated[_params_key(params)][1] for params in candidates]))
+            if checkpoint:
+                save_checkpoint(checkpoint, model_type, space, data_digest, swarm, evaluated)
+            if progress is not None:
+                progress(swarm.iteration, swarm.best[1])
+    finally:
+        if pool is not None:
+            pool.shutdown(cancel_futures=True)
+            manager.shutdown()
+
+    if not evaluated:
+        raise TimeoutError("时间预算内没有完成任何一个候选的评估")
+    return min(evaluated.values(), key=lambda item: item[1])
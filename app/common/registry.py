@@ -0,0 +1,92 @@
+# coding: utf-8
+import os
+import platform
+import time
+
+import joblib
+import numpy as np
+import sklearn
+import xgboost
+
+from .json_store import JsonStore
+
+
+# 全局模型（所有作物共用）在索引中的作物键
+GLOBAL_KEY = '*'
+
+# 训练模型时使用的库版本，版本变化后旧模型可能无法加载
+LIBRARY_VERSIONS = {
+    'python': platform.python_version(),
+    'numpy': np.__version__,
+    'scikit-learn': sklearn.__version__,
+    'xgboost': xgboost.__version__,
+    'joblib': joblib.__version__,
+}
+
+
+class ModelRegistry(JsonStore):
+    """ 已训练模型的索引，保存在模型目录下的 registry.json
+
+    文件内容为 {模型类型: {作物: 记录}}，全局模型的作物记为 GLOBAL_KEY。记录包含模型文件名（相对模型目录）、
+    文件大小、存储方式（见 storage）、训练耗时、行数、训练数据与超参数的指纹（见 training.model_fingerprint）、
+    只由超参数计算的指纹（见 training.params_fingerprint）、库版本和训练时间。
+    只在主进程中写入，子进程训练的模型由 train_crops 收到保存消息后登记。
+    """
+
+    FILENAME = 'registry.json'
+
+    @staticmethod
+    def _crop_key(crop):
+        return GLOBAL_KEY if crop is None else str(crop)
+
+    def entry(self, model_type, crop):
+        """ 模型的记录，crop 为 None 时为全局模型，没有记录时返回 None """
+        return self._load().get(model_type, {}).get(self._crop_key(crop))
+
+    def filename(self, model_type, crop):
+        """ 模型文件的完整路径，没有记录时返回 None """
+        entry = self.entry(model_type, crop)
+        return os.path.join(self.model_dir, entry['path']) if entry else None
+
+    def storage(self, model_type, crop):
+        """ 模型文件的存储方式，没有记录时返回 None """
+        entry = self.entry(model_type, crop)
+        return entry.get('storage') if entry else None
+
+    def is_stale(self, model_type, crop, fingerprint):
+        """ 没有记录（未训练或旧版本保存的模型）或指纹与当前不一致时需要重新训练 """
+        entry = self.entry(model_type, crop)
+        return entry is None or entry['fingerprint'] != fingerprint
+
+    def can_continue(self, model_type, crop, fingerprint, params):
+        """ 只有训练数据变化、超参数未变且模型文件仍在时才能在原模型上继续训练，超参数变化后须按新的超参数重新训练
+
+        训练（train_crop）和界面计算进度总数时都按此判断，两处的步数才能一致
+        """
+        entry = self.entry(model_type, crop)
+        return entry is not None and entry.get('params') == params and entry['fingerprint'] != fingerprint \
+            and os.path.exists(os.path.join(self.model_dir, entry['path']))
+
+    def record(self, model_type, crop, filename, fingerprint, rows, seconds, storage=None, params=None):
+        """ 登记刚保存的模型文件 """
+        entry = {
+            'path': os.path.relpath(filename, self.model_dir),
+            'size': os.path.getsize(filename),
+            'storage': storage,
+            'seconds': round(seconds, 3),
+            'rows': int(rows),
+            'fingerprint': fingerprint,
+            'params': params,
+            'versions': LIBRARY_VERSIONS,
+            'trained_at': time.strftime('%Y-%m-%d %H:%M:%S'),
+        }
+        with self._lock:
+            entries = {key: dict(crops) for key, crops in self._load().items()}
+            entries.setdefault(model_type, {})[self._crop_key(crop)] = entry
+            self._save(entries)
+
+    def remove(self, model_type, crop):
+        with self._lock:
+            entries = {key: dict(crops) for key, crops in self._load().items()}
+            if entries.get(model_type, {}).pop(self._crop_key(crop), None) is not None:
+                self._save(entries)
@@ -0,0 +1,149 @@
+# coding: utf-8
+import math
+import multiprocessing
+import time
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+
+import numpy as np
+import pandas as pd
+from xgboost import XGBRegressor
+
+from .dataset import FEATURE_COLUMNS
+from .pso import SEARCH_SPACES, decode
+from .training import TrainingCancelled, build_model, fit_model
+
+
+# 验证集比例，所有候选在同一份验证集上比较
+VALIDATION_FRACTION = 0.2
+# XGBoost 在验证集上连续这么多轮没有改善时提前停止
+EARLY_STOPPING_ROUNDS = 20
+# 小预算下 XGBoost 至少训练的轮数
+MIN_ROUNDS = 10
+
+
+def budget_params(model_type, params, fraction):
+    """ 按预算比例缩小 XGBoost 的提升轮数，决策树只按数据量缩小预算 """
+    if model_type == "XGBoostOptimized":
+        params = dict(params, n_estimators=max(MIN_ROUNDS, int(params['n_estimators'] * fraction)))
+    return params
+
+
+def evaluate(model_type, params, X_train, y_train, X_val, y_val, deadline=None, n_jobs=None, cancel=None):
+    """ 训练一个候选并返回 (验证集 MSE, 实际使用的提升轮数)，超过 deadline 或 cancel 被设置时返回 None
+
+    XGBoost 以验证集做提前停止，预测时使用最佳轮数。
+    """
+    model = build_model(model_type, n_jobs, params)
+    fit_params = {}
+    if isinstance(model, XGBRegressor):
+        model.set_params(early_stopping_rounds=EARLY_STOPPING_ROUNDS)
+        fit_params = {'eval_set': [(X_val, y_val)], 'verbose': False}
+    def cancelled():
+        return (deadline is not None and time.time() > deadline) or (cancel is not None and cancel.is_set())
+
+    try:
+        fit_model(model, X_train, y_train, cancelled=cancelled, **fit_params)
+    except TrainingCancelled:
+        return None
+    score = float(np.mean((model.predict(X_val) - y_val) ** 2))
+    rounds = model.best_iteration + 1 if isinstance(model, XGBRegressor) else None
+    return score, rounds
+
+
+# 子进程中的训练集和验证集，由进程池的 initializer 设置，每个进程只传输一次
+_worker_data = None
+
+
+def _init_worker(model_type, X_train, y_train, X_val, y_val, cancel=None):
+    global _worker_data
+    _worker_data = (model_type, X_train, y_train, X_val, y_val, cancel)
+
+
+def _evaluate(params, rows, deadline):
+    model_type, X_train, y_train, X_val, y_val, cancel = _worker_data
+    return evaluate(model_type, params, X_train.iloc[:rows], y_train[:rows], X_val, y_val, deadline, n_jobs=1,
+                    cancel=cancel)
+
+
+def successive_halving(model_type, features, target, candidates=27, eta=3, min_fraction=1 / 9,
+                       time_budget=None, workers=1, seed=42, space=None, progress=None, cancel=None):
+    """ 逐轮淘汰的超参数搜索，返回 (最佳超参数, 验证集 MSE)
+
+    先用 min_fraction 比例的训练数据（XGBoost 同时按比例缩小提升轮数）评估全部随机候选，
+    每轮只保留最好的 1/eta 并把预算乘以 eta，直到用全部数据评估剩下的候选。
+    time_budget 为总耗时上限（秒），到时或 cancel 被设置后正在训练的候选会在当前一批树或一轮提升结束时停止，
+    返回已完成的最高一轮中的最优结果。完整预算下 XGBoost 的 n_estimators 取提前停止时的最佳轮数。
+    每轮结束调用 progress(轮次, 本轮候选数, 当前最佳 MSE)。
+    """
+    space = space or SEARCH_SPACES[model_type]
+    rng = np.random.default_rng(seed)
+    deadline = time.time() + time_budget if time_budget else None
+
+    # 打乱后切出验证集，训练集的前若干行即为各轮使用的嵌套子集
+    order = rng.permutation(len(target))
+    n_val = max(1, int(len(order) * VALIDATION_FRACTION))
+    X = pd.DataFrame(features, columns=FEATURE_COLUMNS)
+    X_val, y_val = X.iloc[order[:n_val]], target[order[:n_val]]
+    X_train, y_train = X.iloc[order[n_val:]].reset_index(drop=True), target[order[n_val:]]
+
+    pool = manager = None
+    if workers > 1:
+        # 取消请求通过 Manager 的事件转发给子进程
+        manager = multiprocessing.Manager()
+        worker_cancel = manager.Event()
+        pool = ProcessPoolExecutor(max_workers=min(workers, candidates), initializer=_init_worker,
+                                   initargs=(model_type, X_train, y_train, X_val, y_val, worker_cancel))
+    else:
+        _init_worker(model_type, X_train, y_train, X_val, y_val, cancel)
+
+    population = decode(space, rng.random((candidates, len(space))))
+    fraction = min_fraction
+    best = None
+    rung = 0
+    try:
+        while population:
+            if (cancel is not None and cancel.is_set()) or (deadline is not None and time.time() > deadline):
+                break
+            rows = max(1, math.ceil(len(y_train) * fraction))
+            tasks = [budget_params(model_type, params, fraction) for params in population]
+            if pool is not None:
+                futures = {pool.submit(_evaluate, params, rows, deadline): params for params in tasks}
+                pending = set(futures)
+                while pending:
+                    _, pending = wait(pending, timeout=0.1, return_when=FIRST_COMPLETED)
+                    if cancel is not None and cancel.is_set():
+                        worker_cancel.set()
+                        for future in pending:
+                            future.cancel()
+                results = [(futures[future], future.result()) for future in futures
+                           if not future.cancelled()]
+            else:
+                results = [(params, _evaluate(params, rows, deadline)) for params in tasks]
+            results = sorted(((params, result) for params, result in results if result is not None),
+                             key=lambda item: item[1][0])
+            if not results:
+                break
+
+            # 候选按原始（未缩小预算的）超参数保留；只有完整预算下提前停止得到的轮数才替换 n_estimators
+            originals = {id(task): original for task, original in zip(tasks, population)}
+            task, (score, rounds) = results[0]
+            params = originals[id(task)]
+            best = (dict(params, n_estimators=rounds) if rounds is not None and fraction >= 1 else params, score)
+            rung += 1
+            if progress is not None:
+                progress(rung, len(population), score)
+            # 只在完整评估了本轮全部候选后才淘汰，被截止时间打断的一轮直接结束
+            if fraction >= 1 or len(results) < len(population):
+                break
+            keep = max(1, len(population) // eta)
+            population = [originals[id(task)] for task, _ in results[:keep]]
+            # 避免浮点误差多出一轮接近完整预算的评估
+            fraction = 1.0 if fraction * eta >= 1 - 1e-9 else fraction * eta
+    finally:
+        if pool is not None:
+            pool.shutdown(cancel_futures=True)
+            manager.shutdown()
+
+    if best is None:
+        raise TimeoutError("时间预算内没有完成任何一个候选的评估")
+    return best
@@ -7,6 +7,7 @@ class SignalBus(QObject):
 
     checkUpdateSig = Signal()
     micaEnableChanged = Signal(bool)
+    dataReadySig = Signal()
 
 
 signalBus = SignalBus()
\ No newline at end of file
@@ -0,0 +1,81 @@
+# coding: utf-8
+import glob
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import pandas as pd
+
+from . import schema
+
+
+def resolve(source):
+    """ 将数据源解析为 CSV 文件列表
+
+    数据源可以是单个文件、glob 通配符（支持 **），或按 Crop=Wheat/Year=2020
+    形式分区的目录（递归查找其中的 *.csv）。
+    """
+    if os.path.isdir(source):
+        files = glob.glob(os.path.join(source, '**', '*.csv'), recursive=True)
+    elif glob.has_magic(source):
+        files = glob.glob(source, recursive=True)
+    else:
+        files = [source] if os.path.exists(source) else []
+    if not files:
+        raise FileNotFoundError(f"数据源中没有找到 CSV 文件: {source}")
+    return sorted(os.path.abspath(f) for f in files)
+
+
+def root_directory(source):
+    """ 数据源所在的根目录，用于解析分区目录名和存放缓存 """
+    if os.path.isdir(source):
+        return os.path.abspath(source)
+    if glob.has_magic(source):
+        # 取通配符之前的目录部分
+        parts = []
+        for part in os.path.normpath(source).split(os.sep):
+            if glob.has_magic(part):
+                break
+            parts.append(part)
+        return os.path.abspath(os.sep.join(parts) or '.')
+    return os.path.dirname(os.path.abspath(source))
+
+
+def partition_values(file_path, root):
+    """ 从文件相对根目录的路径中解析 key=value 形式的分区列 """
+    directory = os.path.relpath(os.path.dirname(file_path), root)
+    values = {}
+    for part in directory.split(os.sep):
+        key, sep, value = part.partition('=')
+        if sep and key:
+            values[key] = value
+    return values
+
+
+def add_partitions(data, partitions):
+    """ 补上分区目录中的列，文件中已有的列优先 """
+    for key, value in partitions.items():
+        if key not in data.columns:
+            data[key] = value
+    return data
+
+
+def read_file(file_path, root, report=None):
+    """ 按 SCHEMA 读取单个 CSV，并补上分区目录中的列 """
+    return add_partitions(schema.read_file(file_path, report), partition_values(file_path, root))
+
+
+def read_files(files, root, workers=1, report=None):
+    """ 用线程池并行读取多个 CSV，最后只拼接一次 """
+    if len(files) == 1:
+        return read_file(files[0], root, report)
+    with ThreadPoolExecutor(max_workers=max(1, min(workers, len(files)))) as pool:
+        frames = list(pool.map(lambda f: read_file(f, root, report), files))
+    return pd.concat(frames, ignore_index=True)
+
+
+def iter_file_chunks(files, root, chunksize, report=None):
+    """ 依次分块读取多个 CSV，并补上分区目录中的列 """
+    for file_path in files:
+        partitions = partition_values(file_path, root)
+        for chunk in schema.iter_chunks(file_path, chunksize, report):
+            yield add_partitions(chunk, partitions)
@@ -0,0 +1,108 @@
+# coding: utf-8
+import joblib
+import numpy as np
+import pandas as pd
+from xgboost import Booster
+
+try:
+    import lz4  # noqa: F401
+    HAS_LZ4 = True
+except ImportError:
+    HAS_LZ4 = False
+
+
+# 模型文件的存储方式：
+#   Mmap  不压缩，numpy 数组原样写入，读取时用 mmap_mode='r' 映射而不是整体读入
+#   Zlib  zlib 压缩，体积约为不压缩的 1/3 ~ 1/4，读取需要解压，适合归档
+#   LZ4   lz4 压缩，比 zlib 略大但解压快得多，需要安装 lz4，未安装时退回 Zlib
+STORAGE_MODES = ["Mmap", "Zlib", "LZ4"]
+DEFAULT_MODE = "Mmap"
+COMPRESSION = {"Mmap": 0, "Zlib": ('zlib', 3), "LZ4": ('lz4', 3)}
+
+# XGBoost 模型以原生的 UBJSON 格式保存（不经过 pickle），与存储方式无关，由文件扩展名区分。
+# 读取不依赖 XGBRegressor 的 Python 类，升级 xgboost 后旧模型仍可读取
+NATIVE_EXTENSION = '.ubj'
+NATIVE_MODE = "UBJSON"
+
+
+class XGBoostPredictor:
+    """ 从原生格式读入的 XGBoost 模型，只包含 Booster，提供与 XGBRegressor 相同的 predict
+
+    输入直接交给 inplace_predict，不构造 DMatrix；DataFrame 的列名须与训练时一致。
+    """
+
+    def __init__(self, booster):
+        self.booster = booster
+        self.feature_names = booster.feature_names
+
+    @classmethod
+    def load(cls, filename):
+        return cls(Booster(model_file=filename))
+
+    def predict(self, X):
+        if isinstance(X, pd.DataFrame) and self.feature_names is not None and list(X.columns) != self.feature_names:
+            raise ValueError(f"特征与训练时不一致: {list(X.columns)} != {self.feature_names}")
+        return self.booster.inplace_predict(np.asarray(X, dtype=np.float32))
+
+
+def is_native(filename):
+    return filename.endswith(NATIVE_EXTENSION)
+
+
+def resolve_mode(mode):
+    """ 实际使用的存储方式 """
+    if mode not in COMPRESSION:
+        raise ValueError(f"未知的存储方式: {mode}")
+    return "Zlib" if mode == "LZ4" and not HAS_LZ4 else mode
+
+
+def dump(model, filename, mode=DEFAULT_MODE):
+    """ 按指定方式保存模型，返回实际使用的存储方式，由 ModelRegistry 记录以便按同样的方式读取
+
+    文件名以 NATIVE_EXTENSION 结尾时 model 须为 XGBRegressor，以原生格式保存，忽略 mode。
+    """
+    if is_native(filename):
+        model.save_model(filename)
+        return NATIVE_MODE
+    mode = resolve_mode(mode)
+    joblib.dump(model, filename, compress=COMPRESSION[mode])
+    return mode
+
+
+def load(filename, mode=None):
+    """ 读取模型；mode 为 "Mmap" 时映射文件中的数组，其余情况（含未知的旧文件）整体读入，压缩格式自动识别
+
+    注意 sklearn 的决策树在反序列化时会把节点数组复制到自己的内存中，映射只省去一次读入缓冲，
+    不能让多个进程共享树的节点；映射对随机森林等大模型主要是缩短读取时间。
+    原生格式的 XGBoost 模型读入为 XGBoostPredictor。
+    """
+    if is_native(filename):
+        return XGBoostPredictor.load(filename)
+    return joblib.load(filename, mmap_mode='r' if mode == "Mmap" else None)
+
+
+def memory_size(model):
+    """ 读入后的模型占用的内存（字节），ModelCache 按此限制缓存的总大小
+
+    压缩保存的模型文件比读入后的模型小得多，不能用文件大小代替：决策树和随机森林按各棵树的节点数组和取值数组计算，
+    XGBoost 按 Booster 序列化后的大小计算，全局模型（training.GlobalModel）按其包装的模型计算。
+    """
+    if isinstance(model, XGBoostPredictor):
+        return len(model.booster.save_raw('ubj'))
+    if hasattr(model, 'get_booster'):
+        return len(model.get_booster().save_raw('ubj'))
+    if hasattr(model, 'estimators_'):
+        return sum(memory_size(tree) for tree in model.estimators_)
+    if hasattr(model, 'tree_'):
+        # __getstate__ 返回直接引用树内存的数组，不复制
+        state = model.tree_.__getstate__()
+        return state['nodes'].nbytes + state['values'].nbytes
+    return memory_size(model.estimator)
+
+
+def load_estimator(filename, estimator):
+    """ 读入可以继续训练的模型；原生格式的文件载入到配置相同、尚未训练的 estimator（XGBRegressor）中 """
+    if is_native(filename):
+        estimator.load_model(filename)
+        return estimator
+    return joblib.load(filename)
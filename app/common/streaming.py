@@ -0,0 +1,145 @@
+# coding: utf-8
+import numpy as np
+import pandas as pd
+
+from . import sources
+from .dataset import COLUMN_MAP, CROP_COLUMN, ZSCORE_COLUMNS, ZSCORE_THRESHOLD, DEFAULT_CHUNKSIZE, compact
+
+
+class CropStats:
+    """ 按作物累积的行数、均值和离差平方和
+
+    每个分块先按作物求出自身的统计量，再用 Welford / Chan 的合并公式并入累计值，
+    整个过程只需一次遍历，内存只与作物数量有关。
+    """
+
+    def __init__(self):
+        self.crops = {}  # 作物种类 -> 行号
+        self.count = np.zeros(0)
+        self.mean = np.zeros((0, len(ZSCORE_COLUMNS)))
+        self.m2 = np.zeros((0, len(ZSCORE_COLUMNS)))
+        self.missing = np.zeros((0, len(ZSCORE_COLUMNS)), dtype=bool)
+
+    def ids(self, crops):
+        """ 将作物种类映射为行号，遇到新作物时扩展统计数组 """
+        new = [crop for crop in pd.unique(crops) if crop not in self.crops]
+        if new:
+            for crop in new:
+                self.crops[crop] = len(self.crops)
+            grow = len(new)
+            self.count = np.concatenate([self.count, np.zeros(grow)])
+            self.mean = np.concatenate([self.mean, np.zeros((grow, self.mean.shape[1]))])
+            self.m2 = np.concatenate([self.m2, np.zeros((grow, self.m2.shape[1]))])
+            self.missing = np.concatenate([self.missing, np.zeros((grow, self.missing.shape[1]), dtype=bool)])
+        return pd.Series(crops).map(self.crops).to_numpy()
+
+    def update(self, crops, values):
+        """ 并入一个分块：crops 为作物种类，values 为 ZSCORE_COLUMNS 对应的 float64 数组 """
+        ids = self.ids(crops)
+        size = len(self.crops)
+        count = np.bincount(ids, minlength=size).astype('float64')
+        present = count > 0
+
+        missing = np.isnan(values)
+        filled = np.where(missing, 0, values)
+        mean = np.zeros_like(self.mean)
+        m2 = np.zeros_like(self.m2)
+        for j in range(values.shape[1]):
+            mean[present, j] = np.bincount(ids, weights=filled[:, j], minlength=size)[present] / count[present]
+            deviation = filled[:, j] - mean[ids, j]
+            m2[:, j] = np.bincount(ids, weights=deviation ** 2, minlength=size)
+            self.missing[:, j] |= np.bincount(ids, weights=missing[:, j], minlength=size) > 0
+
+        # Chan 等人的并行方差合并公式
+        total = self.count + count
+        weight = np.divide(count, total, out=np.zeros_like(total), where=total > 0)[:, None]
+        delta = mean - self.mean
+        self.mean += delta * weight
+        self.m2 += m2 + delta ** 2 * (self.count[:, None] * weight)
+        self.count = total
+
+    def std(self):
+        """ 总体标准差 (ddof=0)，与 scipy.stats.zscore 一致 """
+        with np.errstate(invalid='ignore', divide='ignore'):
+            return np.sqrt(self.m2 / self.count[:, None])
+
+    def keep_mask(self, crops, values, threshold=ZSCORE_THRESHOLD):
+        """ 用累计的统计量判断一个分块中每一行是否保留 """
+        ids = pd.Series(crops).map(self.crops).to_numpy()
+        std = self.std()
+        with np.errstate(invalid='ignore', divide='ignore'):
+            z_scores = np.abs((values - self.mean[ids]) / std[ids])
+        # 含缺失值的作物 z-score 为 NaN，不剔除任何行
+        outliers = (z_scores > threshold) & ~self.missing[ids]
+        return ~outliers.any(axis=1)
+
+
+def read_chunks(files, root, chunksize, report=None):
+    """ 依次分块读取数据源中的 CSV 并重命名列 """
+    for chunk in sources.iter_file_chunks(files, root, chunksize, report):
+        chunk.rename(columns=COLUMN_MAP, inplace=True)
+        yield chunk
+
+
+class RowHashes:
+    """ 已出现过的整行的 64 位哈希，用于跨分块去重
+
+    哈希保存在有序数组里，每行只占 8 字节。
+    """
+
+    def __init__(self):
+        self.seen = np.zeros(0, dtype='uint64')
+
+    def first_occurrences(self, chunk):
+        """ 返回分块中首次出现的行的掩码，并记录这些行 """
+        # 不同文件的列顺序可能不同，同一列也可能被推断为整数或浮点数，统一后再哈希
+        chunk = chunk[sorted(chunk.columns)]
+        numeric = chunk.select_dtypes('number').columns
+        hashes = pd.util.hash_pandas_object(chunk.astype(dict.fromkeys(numeric, 'float64')), index=False).to_numpy()
+        first = ~pd.Series(hashes).duplicated().to_numpy()
+        if len(self.seen):
+            position = np.minimum(np.searchsorted(self.seen, hashes), len(self.seen) - 1)
+            first &= self.seen[position] != hashes
+        # 把本块新出现的哈希按序插入，保持数组有序
+        new = np.sort(hashes[first])
+        self.seen = np.insert(self.seen, np.searchsorted(self.seen, new), new)
+        return first
+
+
+def crop_rows(chunk, first):
+    """ 去重并丢弃作物种类缺失的行，返回作物种类和参与 z-score 的数值 """
+    chunk = chunk[first & chunk[CROP_COLUMN].notna().to_numpy()]
+    return chunk, chunk[CROP_COLUMN].to_numpy(), chunk[ZSCORE_COLUMNS].to_numpy(dtype='float64')
+
+
+def iter_cleaned_chunks(files, root, threshold=ZSCORE_THRESHOLD, chunksize=DEFAULT_CHUNKSIZE, report=None):
+    """ 分块读取 CSV 并剔除异常值，逐块产出保留的行
+
+    第一遍去重并累积每种作物的均值和方差，第二遍用最终的 z-score 边界过滤。
+    去重结果以位图形式在两遍之间复用；被拒绝的行只在第一遍记录到 report。
+    """
+    stats = CropStats()
+    masks = []
+    hashes = RowHashes()
+    for chunk in read_chunks(files, root, chunksize, report):
+        first = hashes.first_occurrences(chunk)
+        _, crops, values = crop_rows(chunk, first)
+        stats.update(crops, values)
+        masks.append(np.packbits(first))
+
+    categories = sorted(stats.crops)
+    for chunk, mask in zip(read_chunks(files, root, chunksize), masks):
+        first = np.unpackbits(mask, count=len(chunk)).astype(bool)
+        chunk, crops, values = crop_rows(chunk, first)
+        chunk = chunk[stats.keep_mask(crops, values, threshold)]
+        yield chunk.assign(**{CROP_COLUMN: pd.Categorical(chunk[CROP_COLUMN], categories=categories)})
+
+
+def stream_dataset(files, root, threshold=ZSCORE_THRESHOLD, chunksize=DEFAULT_CHUNKSIZE, report=None):
+    """ 流式读取并清洗数据，返回紧凑布局的数据集
+
+    保留的行与 load_dataset 相同，但保持文件中的顺序而不按作物重排，
+    避免在内存中再复制一份结果；CropDataset 构建时会按作物稳定排序。
+    """
+    return pd.concat([compact(chunk) for chunk in iter_cleaned_chunks(files, root, threshold, chunksize, report)],
+                     ignore_index=True)
@@ -0,0 +1,394 @@
+# coding: utf-8
+import hashlib
+import json
+import multiprocessing
+import os
+import queue
+import time
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+from types import SimpleNamespace
+
+import numpy as np
+import pandas as pd
+from sklearn.base import clone
+from sklearn.ensemble import RandomForestRegressor
+from sklearn.tree import DecisionTreeRegressor
+from xgboost import XGBRegressor
+from xgboost.callback import TrainingCallback
+
+from . import storage
+from .dataset import CROP_COLUMN, FEATURE_COLUMNS, data_fingerprint
+from .registry import ModelRegistry
+from .tuned_params import TunedParams
+
+
+# 界面中可选的全部模型类型
+MODEL_TYPES = ["RandomForest", "DecisionTree", "XGBoost", "DecisionTreeOptimized", "XGBoostOptimized"]
+# 以 XGBoost 原生格式保存的模型类型（见 storage.NATIVE_EXTENSION），其余模型用 joblib 保存
+NATIVE_TYPES = ["XGBoost", "XGBoostOptimized"]
+
+# 随机森林每次增长的树数，取消训练的延迟不超过训练这么多棵树的时间
+FOREST_SLICE = 10
+# XGBoost 未指定 n_estimators 时的默认提升轮数
+XGB_DEFAULT_ROUNDS = 100
+# 增量更新时随机森林增加的树数和 XGBoost 增加的提升轮数
+CONTINUE_STEPS = 20
+# 主进程等待子进程消息的间隔（秒）
+POLL_INTERVAL = 0.1
+# 只影响训练速度或训练过程、不影响模型结果的超参数，不计入指纹
+RUNTIME_PARAMS = {'n_jobs', 'callbacks', 'warm_start'}
+
+
+class TrainingCancelled(Exception):
+    """ 训练被取消 """
+
+
+def model_path(model_dir, model_type, crop):
+    extension = storage.NATIVE_EXTENSION if model_type in NATIVE_TYPES else '.pkl'
+    return os.path.join(model_dir, f"{model_type}_model_crop_{crop}{extension}")
+
+
+# 优化后模型的默认超参数：之前用粒子群优化得到的最佳超参数，可由 params 覆盖
+OPTIMIZED_PARAMS = {
+    "DecisionTreeOptimized": {'max_depth': 20, 'min_samples_split': 3, 'min_samples_leaf': 1},
+    "XGBoostOptimized": {'n_estimators': 200, 'max_depth': 10, 'learning_rate': 0.09713775005616568},
+}
+
+
+def build_model(model_type, n_jobs=None, params=None):
+    """ 根据模型类型返回相应的回归模型
+
+    n_jobs 为模型内部使用的线程数，多进程训练时每个进程只用一个线程，避免线程数超过核心数。
+    params 为优化后模型的超参数，缺省时使用 OPTIMIZED_PARAMS。
+    """
+    if model_type == "RandomForest":
+        return RandomForestRegressor(n_estimators=100, random_state=42, n_jobs=n_jobs)
+    elif model_type == "DecisionTree":
+        return DecisionTreeRegressor(random_state=42)
+    elif model_type == "DecisionTreeOptimized":
+        return DecisionTreeRegressor(random_state=42, **(params or OPTIMIZED_PARAMS[model_type]))
+    elif model_type == "XGBoost":
+        return XGBRegressor(objective="reg:squarederror", random_state=42, n_jobs=n_jobs)
+    elif model_type == "XGBoostOptimized":
+        return XGBRegressor(random_state=42, n_jobs=n_jobs, **(params or OPTIMIZED_PARAMS[model_type]))
+    else:
+        raise ValueError(f"未知的模型类型: {model_type}")
+
+
+def crop_model(model_dir, model_type, crop, n_jobs=None):
+    """ 使用该作物调优得到的超参数构建模型，没有调优记录时使用默认超参数 """
+    return build_model(model_type, n_jobs, TunedParams(model_dir).get(model_type, crop))
+
+
+def _params_text(model):
+    params = {key: value for key, value in model.get_params().items() if key not in RUNTIME_PARAMS}
+    return json.dumps(params, sort_keys=True, default=str)
+
+
+def model_fingerprint(data_digest, model):
+    """ 由训练数据的摘要和模型（训练前）的超参数计算指纹，两者之一变化时模型需要重新训练 """
+    text = data_digest + _params_text(model)
+    return hashlib.blake2b(text.encode('utf-8'), digest_size=16).hexdigest()
+
+
+def params_fingerprint(model):
+    """ 只由超参数计算的指纹，与 model_fingerprint 一起登记，用于判断能否在原模型上继续训练 """
+    return hashlib.blake2b(_params_text(model).encode('utf-8'), digest_size=16).hexdigest()
+
+
+def crop_fingerprint(model_dir, model_type, crop, data_digest):
+    """ 该作物的模型按当前数据和超参数训练时应有的指纹，data_digest 见 CropDataset.fingerprint """
+    return model_fingerprint(data_digest, crop_model(model_dir, model_type, crop))
+
+
+def save_model(model, filename, mode=storage.DEFAULT_MODE):
+    """ 按存储方式 mode 保存模型文件并返回实际使用的方式（见 storage），之后由调用方在 ModelRegistry 中登记 """
+    return storage.dump(model, filename, mode)
+
+
+def model_steps(model):
+    """ 模型训练的进度步数：随机森林为树的棵数，XGBoost 为提升轮数，其余模型为 1 """
+    if isinstance(model, RandomForestRegressor):
+        return model.n_estimators
+    if isinstance(model, XGBRegressor):
+        return model.n_estimators or XGB_DEFAULT_ROUNDS
+    return 1
+
+
+def is_incremental(model):
+    """ 随机森林和 XGBoost 可以在原模型上继续训练，决策树只能重新训练 """
+    return isinstance(model, (RandomForestRegressor, XGBRegressor))
+
+
+def continue_steps(model):
+    """ 增量更新的进度步数：随机森林和 XGBoost 只训练新增的部分，其余模型重新训练 """
+    return CONTINUE_STEPS if is_incremental(model) else model_steps(model)
+
+
+class _ProgressCallback(TrainingCallback):
+    """ 每完成一轮提升汇报一次进度，并在取消时中断训练 """
+
+    def __init__(self, report, cancelled):
+        super().__init__()
+        self.report = report
+        self.cancelled = cancelled
+
+    def after_iteration(self, model, epoch, evals_log):
+        self.report(1)
+        if self.cancelled():
+            raise TrainingCancelled()
+        return False
+
+
+def fit_model(model, X, y, report=None, cancelled=None, **fit_params):
+    """ 训练模型并按步汇报进度，cancelled() 返回 True 时抛出 TrainingCancelled
+
+    随机森林用 warm_start 每次增加 FOREST_SLICE 棵树，结果与一次训练完全相同，
+    传入时已开启 warm_start 的随机森林在已有的树之上继续增加；
+    XGBoost 通过训练回调逐轮汇报，fit_params 原样传给 fit。
+    """
+    report = report or (lambda steps: None)
+    cancelled = cancelled or (lambda: False)
+    if isinstance(model, RandomForestRegressor):
+        total = model.n_estimators
+        grown = len(model.estimators_) if model.warm_start and hasattr(model, 'estimators_') else 0
+        model.set_params(warm_start=True)
+        while grown < total:
+            if cancelled():
+                raise TrainingCancelled()
+            model.set_params(n_estimators=min(grown + FOREST_SLICE, total))
+            model.fit(X, y)
+            report(len(model.estimators_) - grown)
+            grown = len(model.estimators_)
+        model.set_params(warm_start=False)
+    elif isinstance(model, XGBRegressor):
+        model.set_params(callbacks=[_ProgressCallback(report, cancelled)])
+        try:
+            model.fit(X, y, **fit_params)
+        finally:
+            # 回调对象不随模型保存
+            model.set_params(callbacks=None)
+    else:
+        if cancelled():
+            raise TrainingCancelled()
+        model.fit(X, y)
+        report(1)
+    return model
+
+
+def continue_model(previous, model, X, y, report=None, cancelled=None):
+    """ 在已训练的模型 previous 上继续训练，不从头重建
+
+    model 为按当前超参数新建、尚未训练的模型，previous 须是用同样的超参数训练的（见 ModelRegistry.can_continue）。
+    随机森林通过 warm_start 在 previous 上增加 CONTINUE_STEPS 棵用当前数据训练的树；
+    XGBoost 以 previous 为起点（xgb_model）再提升 CONTINUE_STEPS 轮，拟合当前数据上的残差；
+    决策树没有增量训练方式，直接训练 model。
+    """
+    if isinstance(previous, RandomForestRegressor):
+        previous.set_params(warm_start=True, n_estimators=len(previous.estimators_) + CONTINUE_STEPS)
+        return fit_model(previous, X, y, report, cancelled)
+    if isinstance(previous, XGBRegressor):
+        model.set_params(n_estimators=CONTINUE_STEPS)
+        fit_model(model, X, y, report, cancelled, xgb_model=previous.get_booster())
+        # n_estimators 记录模型中的总轮数
+        model.set_params(n_estimators=model.get_booster().num_boosted_rounds())
+        return model
+    return fit_model(model, X, y, report, cancelled)
+
+
+def train_crop(model_types, crop, features, target, model_dir, n_jobs=None, messages=None, cancel=None,
+               update=False, mode=storage.DEFAULT_MODE):
+    """ 用同一份作物数据依次训练并保存多种模型，在子进程中运行，只依赖可序列化的参数
+
+    进度通过 messages.put((作物, 模型类型, 步数, 已保存)) 汇报，模型保存后"已保存"为登记用的
+    {指纹, 超参数指纹, 行数, 耗时, 存储方式}，其余消息中为 False；cancel.is_set() 为真时中断训练，
+    已保存的模型保留，正在训练的模型不会写入文件。
+    update 为 True 时，只有训练数据变化而超参数未变的模型在原模型上继续训练（见 continue_model），
+    超参数变化（如调优后）的模型按新的超参数重新训练。mode 为模型文件的存储方式（见 storage）。
+    """
+    X = pd.DataFrame(features, columns=FEATURE_COLUMNS, copy=False)
+    cancelled = cancel.is_set if cancel is not None else None
+    data_digest = data_fingerprint(features, target)
+    registry = ModelRegistry(model_dir)
+    for model_type in model_types:
+        report = (lambda steps: messages.put((crop, model_type, steps, False))) if messages is not None else None
+        filename = model_path(model_dir, model_type, crop)
+        model = crop_model(model_dir, model_type, crop, n_jobs)
+        fingerprint = model_fingerprint(data_digest, model)
+        params = params_fingerprint(model)
+        start = time.perf_counter()
+        if update and is_incremental(model) and registry.can_continue(model_type, crop, fingerprint, params):
+            # 原模型会被修改，整体读入而不是映射
+            previous = storage.load_estimator(registry.filename(model_type, crop), clone(model))
+            model = continue_model(previous, model, X, target, report, cancelled)
+        else:
+            model = fit_model(model, X, target, report, cancelled)
+        saved_mode = save_model(model, filename, mode)
+        if messages is not None:
+            info = {'fingerprint': fingerprint, 'params': params, 'rows': len(target),
+                    'seconds': time.perf_counter() - start, 'storage': saved_mode}
+            messages.put((crop, model_type, 0, info))
+    return crop, model_types
+
+
+def train_crops(dataset, jobs, model_dir, workers=1, progress=None, cancel=None, update=False,
+                mode=storage.DEFAULT_MODE):
+    """ 把各作物的训练分发到进程池，返回是否被取消
+
+    jobs 为 {作物: 需要训练的模型类型列表}，每种作物的数据只切片和传输一次。
+    训练过程中调用 progress(作物, 模型类型, 步数, 是否已保存)，步数的总和见 model_steps。
+    cancel（threading.Event）被设置后，各进程在当前的一批树或一轮提升结束时停止。
+    workers 为 1 时在当前线程中依次训练；update 和 mode 见 train_crop。
+    保存的模型在收到子进程的消息后由当前进程登记到 ModelRegistry，索引文件只有一个写入方。
+    """
+    registry = ModelRegistry(model_dir)
+
+    def on_message(crop, model_type, steps, saved):
+        if saved:
+            registry.record(model_type, crop, model_path(model_dir, model_type, crop), **saved)
+        if progress is not None:
+            progress(crop, model_type, steps, bool(saved))
+
+    notify = SimpleNamespace(put=lambda message: on_message(*message))
+    if workers <= 1 or len(jobs) <= 1:
+        try:
+            for crop, model_types in jobs.items():
+                train_crop(model_types, crop, *dataset.arrays(crop), model_dir,
+                           messages=notify, cancel=cancel, update=update, mode=mode)
+        except TrainingCancelled:
+            return True
+        return False
+
+    # 子进程通过 Manager 的队列汇报进度、通过 Manager 的事件接收取消请求；
+    # 代理对象的调用是同步的，任务完成时它发出的消息都已进入队列
+    with multiprocessing.Manager() as manager, \
+            ProcessPoolExecutor(max_workers=min(workers, len(jobs))) as pool:
+        messages, worker_cancel = manager.Queue(), manager.Event()
+        # 工作量大的作物先提交，减少最后只剩一个进程在运行的时间
+        order = sorted(jobs, key=lambda crop: len(dataset.arrays(crop)[1]) * len(jobs[crop]), reverse=True)
+        # 数组按块切片后传给子进程，只序列化该作物的数据
+        pending = {pool.submit(train_crop, jobs[crop], crop, *dataset.arrays(crop), model_dir, 1,
+                               messages, worker_cancel, update, mode) for crop in order}
+        finished = set()
+        while pending:
+            done, pending = wait(pending, timeout=POLL_INTERVAL, return_when=FIRST_COMPLETED)
+            finished |= done
+            _drain(messages, notify)
+            if cancel is not None and cancel.is_set() and not worker_cancel.is_set():
+                worker_cancel.set()
+                for future in pending:
+                    future.cancel()
+        _drain(messages, notify)
+
+        for future in finished:
+            if not future.cancelled() and not isinstance(future.exception(), (TrainingCancelled, type(None))):
+                raise future.exception()
+        return worker_cancel.is_set()
+
+
+def _drain(messages, notify):
+    """ 取出队列中已有的全部进度消息 """
+    while True:
+        try:
+            message = messages.get_nowait()
+        except queue.Empty:
+            return
+        if notify is not None:
+            notify.put(message)
+
+
+def global_model_path(model_dir, model_type):
+    return os.path.join(model_dir, f"{model_type}_model_global.pkl")
+
+
+def global_fingerprint(model_type, dataset):
+    """ 全局模型按当前全部数据训练时应有的指纹 """
+    return model_fingerprint(dataset.fingerprint(), GlobalModel(model_type, dataset.crops).estimator)
+
+
+class GlobalModel:
+    """ 所有作物共用的一个模型，作物种类作为类别特征
+
+    XGBoost 使用原生的类别特征支持，sklearn 模型在数值特征后追加一列作物编号（按名称排序的序号），
+    输入只比数值特征多一列，与作物数无关（one-hot 编码在千万行、数百种作物时需要数十 GB 的稠密矩阵）。
+    训练时的作物列表随模型保存，预测时按同样的类别编码，未见过的作物编号为 -1。
+    旧版本以 one-hot 编码训练的模型读入后仍按 one-hot 预测。
+    序列化时 XGBoost 模型保存为原生 UBJSON 字节，而不是 pickle XGBRegressor。
+    """
+
+    def __init__(self, model_type, crops, n_jobs=None):
+        self.model_type = model_type
+        self.crops = list(crops)
+        self.estimator = build_model(model_type, n_jobs)
+        self.native = isinstance(self.estimator, XGBRegressor)
+        self.one_hot = False
+        if self.native:
+            self.estimator.set_params(enable_categorical=True, tree_method='hist')
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        if self.native:
+            state['estimator'] = bytes(self.estimator.get_booster().save_raw('ubj'))
+        return state
+
+    def __setstate__(self, state):
+        state.setdefault('one_hot', True)
+        self.__dict__.update(state)
+        if self.native:
+            estimator = build_model(self.model_type)
+            estimator.set_params(enable_categorical=True, tree_method='hist')
+            estimator.load_model(bytearray(state['estimator']))
+            self.estimator = estimator
+
+    def _design(self, features, codes):
+        """ 由数值特征和作物编号构造模型输入 """
+        if self.native:
+            X = pd.DataFrame(features, columns=FEATURE_COLUMNS)
+            X[CROP_COLUMN] = pd.Categorical.from_codes(codes, categories=self.crops)
+            return X
+        X = np.empty((len(codes), len(FEATURE_COLUMNS) + 1), dtype='float32')
+        X[:, :-1] = features
+        X[:, -1] = codes
+        if not self.one_hot:
+            return X
+        one_hot = np.zeros((len(codes), len(self.crops)), dtype='float32')
+        known = codes >= 0
+        one_hot[np.flatnonzero(known), codes[known]] = 1
+        return np.hstack([X[:, :-1], one_hot])
+
+    def fit(self, dataset, report=None, cancelled=None):
+        features, target, codes = dataset.all_rows()
+        fit_model(self.estimator, self._design(features, codes), target, report, cancelled)
+        return self
+
+    def predict(self, X, crop):
+        """ X 为 FEATURE_COLUMNS 对应的特征，所有行都属于作物 crop """
+        code = self.crops.index(crop) if crop in self.crops else -1
+        return self.estimator.predict(self._design(X, np.full(len(X), code, dtype='int32')))
+
+
+def train_global(dataset, model_types, model_dir, n_jobs=None, progress=None, cancel=None,
+                 mode=storage.DEFAULT_MODE):
+    """ 依次训练各模型类型的全局模型，返回是否被取消
+
+    一个模型包含全部数据，并行度来自模型内部的 n_jobs 线程而不是进程池。
+    训练过程中调用 progress(模型类型, 步数, 是否已保存)，步数的总和见 model_steps。
+    """
+    cancelled = cancel.is_set if cancel is not None else None
+    registry = ModelRegistry(model_dir)
+    for model_type in model_types:
+        report = (lambda steps: progress(model_type, steps, False)) if progress is not None else None
+        model = GlobalModel(model_type, dataset.crops, n_jobs)
+        fingerprint = model_fingerprint(dataset.fingerprint(), model.estimator)
+        start = time.perf_counter()
+        try:
+            model.fit(dataset, report, cancelled)
+        except TrainingCancelled:
+            return True
+        filename = global_model_path(model_dir, model_type)
+        saved_mode = save_model(model, filename, mode)
+        registry.record(model_type, None, filename, fingerprint, len(dataset), time.perf_counter() - start,
+                        saved_mode, params_fingerprint(model.estimator))
+        if progress is not None:
+            progress(model_type, 0, True)
+    return False
@@ -0,0 +1,42 @@
+# coding: utf-8
+import time
+
+from .json_store import JsonStore
+
+
+class TunedParams(JsonStore):
+    """ 按 (模型类型, 作物) 保存调优得到的超参数，保存在模型目录下的 tuned_params.json
+
+    文件内容为 {模型类型: {作物: 记录}}，记录包含超参数、验证得分、搜索方式、耗时和调优时的行数。
+    文件未变化时各实例共用解析结果（见 JsonStore），逐个作物查询只需一次 stat，不会重复解析。
+    """
+
+    FILENAME = 'tuned_params.json'
+
+    def entry(self, model_type, crop):
+        """ 完整的调优记录，没有时返回 None """
+        return self._load().get(model_type, {}).get(str(crop))
+
+    def get(self, model_type, crop):
+        """ 调优得到的超参数，没有时返回 None，由 build_model 使用默认超参数 """
+        entry = self.entry(model_type, crop)
+        return entry['params'] if entry else None
+
+    def put(self, model_type, crop, params, score, seconds, method, rows):
+        with self._lock:
+            entries = {key: dict(crops) for key, crops in self._load().items()}
+            entries.setdefault(model_type, {})[str(crop)] = {
+                'params': params,
+                'score': score,
+                'method': method,
+                'seconds': round(seconds, 3),
+                'rows': rows,
+                'tuned_at': time.strftime('%Y-%m-%d %H:%M:%S'),
+            }
+            self._save(entries)
+
+    def remove(self, model_type, crop):
+        with self._lock:
+            entries = {key: dict(crops) for key, crops in self._load().items()}
+            if entries.get(model_type, {}).pop(str(crop), None) is not None:
+                self._save(entries)
@@ -0,0 +1,82 @@
+# coding: utf-8
+import os
+import time
+
+from . import pso, search
+from .incremental import DirtyModels
+from .tuned_params import TunedParams
+
+
+# 可调优的模型类型及可选的搜索方式
+TUNABLE_TYPES = list(pso.SEARCH_SPACES)
+TUNING_METHODS = ["Halving", "PSO"]
+# 行数少于此值的作物无法划分交叉验证的各折和验证集，不参与调优
+MIN_ROWS = 10
+
+
+def checkpoint_path(model_dir, model_type, crop):
+    return os.path.join(model_dir, 'pso', f"{model_type}_crop_{crop}.json")
+
+
+def tune_crop(model_dir, model_type, crop, features, target, method="Halving", time_budget=None, workers=1,
+              cancel=None):
+    """ 为一种作物搜索超参数并写入 TunedParams，返回 (超参数, 得分)，被取消时返回 None
+
+    time_budget 秒内没有完成任何候选的评估时抛出 TimeoutError。
+    结果保存后该作物的模型标记为过期，下次预训练时用新的超参数重新训练。
+    粒子群搜索被取消时保留检查点，下次调优从中断处继续（数据已变化时重新搜索，见 pso.optimize）；完成后删除检查点。
+    """
+    start = time.perf_counter()
+    checkpoint = checkpoint_path(model_dir, model_type, crop)
+    try:
+        if method == "PSO":
+            params, score = pso.optimize(model_type, features, target, workers=workers, checkpoint=checkpoint,
+                                         cancel=cancel, time_budget=time_budget)
+        elif method == "Halving":
+            params, score = search.successive_halving(model_type, features, target, time_budget=time_budget,
+                                                      workers=workers, cancel=cancel)
+        else:
+            raise ValueError(f"未知的调优方式: {method}")
+    except TimeoutError:
+        # 第一轮评估完成前就被取消
+        if cancel is not None and cancel.is_set():
+            return None
+        raise
+    if cancel is not None and cancel.is_set():
+        return None
+
+    TunedParams(model_dir).put(model_type, crop, params, score, time.perf_counter() - start, method, len(target))
+    DirtyModels(model_dir).mark([crop], [model_type])
+    if method == "PSO" and os.path.exists(checkpoint):
+        os.remove(checkpoint)
+    return params, score
+
+
+def tune_crops(dataset, model_dir, model_type, method="Halving", time_budget=None, workers=1, progress=None,
+               cancel=None):
+    """ 依次为每种作物调优，返回 (已调优的作物, 跳过的作物)
+
+    time_budget 为全部作物的总时间上限（秒），每种作物分到剩余时间的平均份额，提前完成的作物把时间留给之后的作物。
+    行数少于 MIN_ROWS 的作物和在分到的时间内没有完成任何评估的作物跳过。
+    每处理完一种作物调用 progress(已处理数, 作物总数)；cancel 被设置后停止，已调优的结果保留。
+    """
+    crops = list(dataset.crops)
+    deadline = time.perf_counter() + time_budget if time_budget else None
+    tuned, skipped = [], []
+    for index, crop in enumerate(crops):
+        if cancel is not None and cancel.is_set():
+            break
+        features, target = dataset.arrays(crop)
+        budget = (deadline - time.perf_counter()) / (len(crops) - index) if deadline is not None else None
+        if len(target) < MIN_ROWS or (budget is not None and budget <= 0):
+            skipped.append(crop)
+        else:
+            try:
+                if tune_crop(model_dir, model_type, crop, features, target, method, budget, workers, cancel) is None:
+                    break
+                tuned.append(crop)
+            except TimeoutError:
+                skipped.append(crop)
+        if progress is not None:
+            progress(index + 1, len(crops))
+    return tuned, skipped
@@ -13,6 +13,7 @@ from ..common.icon import Icon
 from ..common import resource
 from ..view.ui_homepage import Page1
 from ..view.ui_predictpage import PredictPage
+from ..view.ui_evaluationpage import EvaluationPage
 
      
 class MainWindow(SplitFluentWindow):
@@ -21,6 +22,7 @@ class MainWindow(SplitFluentWindow):
         super().__init__()
         self.page1 = Page1(self)
         self.predict_page = PredictPage(self)
+        self.evaluation_page = EvaluationPage(self.predict_page, self)
         self.settingInterface = SettingInterface(self)
         self.initNavigation()
         self.initWindow()
@@ -45,6 +47,7 @@ class MainWindow(SplitFluentWindow):
         # 添加子界面
         self.addSubInterface(self.page1, FIF.HOME_FILL, '主页')
         self.addSubInterface(self.predict_page, FIF.VIEW, '作物预测')
+        self.addSubInterface(self.evaluation_page, FIF.DOCUMENT, '模型评估')
         self.addSubInterface(self.settingInterface, FIF.SETTING, '设置', position=NavigationItemPosition.BOTTOM)
 
         # 添加帮助项
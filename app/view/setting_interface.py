@@ -1,14 +1,15 @@
 # coding:utf-8
 from qfluentwidgets import (SwitchSettingCard, 
                             HyperlinkCard, PrimaryPushSettingCard, ScrollArea,
-                            ComboBoxSettingCard, ExpandLayout,setTheme, setFont)
+                            ComboBoxSettingCard, ExpandLayout,setTheme, setFont,
+                            PushSettingCard, RangeSettingCard)
 from qfluentwidgets import FluentIcon as FIF
 from qfluentwidgets import SettingCardGroup as CardGroup
 from qfluentwidgets import InfoBar
 import sys
 from PySide6.QtCore import Qt, QUrl
 from PySide6.QtGui import QDesktopServices, QFont
-from PySide6.QtWidgets import QWidget, QLabel
+from PySide6.QtWidgets import QWidget, QLabel, QFileDialog
 from ..common.config import cfg, isWin11
 from ..common.setting import HELP_URL, FEEDBACK_URL, AUTHOR, VERSION, YEAR
 from ..common.signal_bus import signalBus
@@ -83,6 +84,64 @@ class SettingInterface(ScrollArea):
             parent=self.personalGroup
         )
 
+        # data
+        self.dataGroup = SettingCardGroup(self.tr("Data"), self.scrollWidget)
+        self.dataSourceCard = PushSettingCard(
+            self.tr('Choose folder'),
+            FIF.FOLDER,
+            self.tr("Dataset source"),
+            cfg.get(cfg.dataSource) or self.tr("Default dataset (app/product_regressiondb.csv)"),
+            self.dataGroup
+        )
+        self.readWorkersCard = RangeSettingCard(
+            cfg.readWorkers,
+            FIF.SPEED_HIGH,
+            self.tr("Parallel file reads"),
+            self.tr("Number of CSV files read at the same time"),
+            parent=self.dataGroup
+        )
+        self.trainWorkersCard = RangeSettingCard(
+            cfg.trainWorkers,
+            FIF.SPEED_HIGH,
+            self.tr("Training processes"),
+            self.tr("Number of crop models trained in parallel"),
+            parent=self.dataGroup
+        )
+        self.modelLayoutCard = ComboBoxSettingCard(
+            cfg.modelLayout,
+            FIF.TILES,
+            self.tr("Model layout"),
+            self.tr("One model per crop, or one global model with the crop as a categorical feature"),
+            texts=[self.tr("One model per crop"), self.tr("Global model")],
+            parent=self.dataGroup
+        )
+        self.modelStorageCard = ComboBoxSettingCard(
+            cfg.modelStorage,
+            FIF.SAVE,
+            self.tr("Model storage"),
+            self.tr("Uncompressed files load fastest, compressed files take less disk space"),
+            texts=[self.tr("Uncompressed (memory-mapped)"), self.tr("zlib compressed"), self.tr("lz4 compressed")],
+            parent=self.dataGroup
+        )
+
+        # tuning
+        self.tuningGroup = SettingCardGroup(self.tr("Hyperparameter tuning"), self.scrollWidget)
+        self.tuneMethodCard = ComboBoxSettingCard(
+            cfg.tuneMethod,
+            FIF.DEVELOPER_TOOLS,
+            self.tr("Search method"),
+            self.tr("Successive halving is faster, particle swarm searches more thoroughly"),
+            texts=[self.tr("Successive halving"), self.tr("Particle swarm")],
+            parent=self.tuningGroup
+        )
+        self.tuneTimeBudgetCard = RangeSettingCard(
+            cfg.tuneTimeBudget,
+            FIF.STOP_WATCH,
+            self.tr("Total time budget (s)"),
+            self.tr("Shared by all crops; each crop keeps the best result evaluated before its share runs out"),
+            parent=self.tuningGroup
+        )
+
         # update software
         self.updateSoftwareGroup = SettingCardGroup(
             self.tr("Software update"), self.scrollWidget)
@@ -154,6 +213,15 @@ class SettingInterface(ScrollArea):
         self.personalGroup.addSettingCard(self.zoomCard)
         self.personalGroup.addSettingCard(self.languageCard)
 
+        self.dataGroup.addSettingCard(self.dataSourceCard)
+        self.dataGroup.addSettingCard(self.readWorkersCard)
+        self.dataGroup.addSettingCard(self.trainWorkersCard)
+        self.dataGroup.addSettingCard(self.modelLayoutCard)
+        self.dataGroup.addSettingCard(self.modelStorageCard)
+
+        self.tuningGroup.addSettingCard(self.tuneMethodCard)
+        self.tuningGroup.addSettingCard(self.tuneTimeBudgetCard)
+
         self.updateSoftwareGroup.addSettingCard(self.updateOnStartUpCard)
 
         self.aboutGroup.addSettingCard(self.helpCard)
@@ -164,6 +232,8 @@ class SettingInterface(ScrollArea):
         self.expandLayout.setSpacing(28)
         self.expandLayout.setContentsMargins(36, 10, 36, 0)
         self.expandLayout.addWidget(self.personalGroup)
+        self.expandLayout.addWidget(self.dataGroup)
+        self.expandLayout.addWidget(self.tuningGroup)
         self.expandLayout.addWidget(self.updateSoftwareGroup)
         self.expandLayout.addWidget(self.aboutGroup)
 
@@ -190,6 +260,9 @@ class SettingInterface(ScrollArea):
         # if sys.platform == "win32":
         #     self.themeCard.comboBox.currentIndexChanged.connect(self.__onthemeCard)
             
+        # data
+        self.dataSourceCard.clicked.connect(self.__onDataSourceCardClicked)
+
         # check update
         self.aboutCard.clicked.connect(signalBus.checkUpdateSig)
 
@@ -197,6 +270,15 @@ class SettingInterface(ScrollArea):
         self.feedbackCard.clicked.connect(
             lambda: QDesktopServices.openUrl(QUrl(FEEDBACK_URL)))
     
+    def __onDataSourceCardClicked(self):
+        """ data source card clicked slot """
+        folder = QFileDialog.getExistingDirectory(self, self.tr("Choose folder"), "./")
+        if not folder or cfg.get(cfg.dataSource) == folder:
+            return
+
+        cfg.set(cfg.dataSource, folder)
+        self.dataSourceCard.setContent(folder)
+
     def __onBackgroundEffectCardChanged(self, option):
         """ background effect card changed slot """
         self.window().applyBackgroundEffectByCfg()
@@ -0,0 +1,185 @@
+# -*- coding: utf-8 -*-
+import os
+import threading
+
+from PySide6.QtCore import Qt, QThread, Signal
+from PySide6.QtWidgets import QWidget, QVBoxLayout, QHBoxLayout, QTableWidgetItem
+from qfluentwidgets import (PushButton, TableWidget, ProgressBar, SubtitleLabel, ComboBox, InfoBar,
+                            InfoBarPosition)
+
+from ..common.config import cfg
+from ..common.evaluation import DEFAULT_FOLDS, METRICS, evaluate, best_model_types
+from ..common.signal_bus import signalBus
+from ..common.training import MODEL_TYPES
+from .ui_predictpage import get_current_directory
+
+
+# 模型类型在界面中的名称，与预测页的下拉框一致
+MODEL_NAMES = {
+    "RandomForest": "随机森林回归",
+    "DecisionTree": "CART决策树回归",
+    "XGBoost": "XGBoost回归",
+    "DecisionTreeOptimized": "优化后的CART决策树回归",
+    "XGBoostOptimized": "优化后的XGBoost回归",
+}
+
+
+# 交叉验证线程
+class EvaluateModelsThread(QThread):
+    progress_signal = Signal(int)  # 信号：已完成折数的百分比
+    finished_signal = Signal(object)  # 信号：评估完成，携带 {(作物, 模型类型): 记录}，出错时为 None
+    error_signal = Signal(str)  # 信号：评估出错，携带错误信息，之后仍会发出 finished_signal
+
+    def __init__(self, dataset, model_types, workers=1):
+        super().__init__()
+        self.dataset = dataset  # 按作物分块的训练数据
+        self.model_types = model_types  # 要评估的模型类型列表
+        self.workers = workers  # 并行评估的进程数
+        self._cancel = threading.Event()
+
+    def run(self):
+        model_dir = os.path.join(os.path.dirname(get_current_directory()), "models")
+        if not os.path.exists(model_dir):
+            os.makedirs(model_dir)
+        results = None
+        try:
+            results = evaluate(self.dataset, model_dir, self.model_types, DEFAULT_FOLDS, self.workers,
+                               progress=lambda done, total: self.progress_signal.emit(int(done / total * 100)),
+                               cancel=self._cancel)
+            self.progress_signal.emit(100)
+        except Exception as e:
+            self.error_signal.emit(str(e))
+        # 无论是否出错都发出完成信号，使界面恢复按钮；已完成的组合已写入缓存
+        self.finished_signal.emit(results)
+
+    def stop(self):
+        """停止线程"""
+        self._cancel.set()
+
+    def cancelled(self):
+        return self._cancel.is_set()
+
+
+class EvaluationPage(QWidget):
+    """ 模型评估页：各作物、各模型类型的 k 折交叉验证指标，每种作物的最佳模型类型标记为 ★ """
+
+    def __init__(self, predict_page, parent=None):
+        super().__init__(parent)
+        self.setObjectName("evaluationpage")
+        self.predict_page = predict_page  # 训练数据由预测页加载
+        self.eval_thread = None
+        self.results = {}
+        self.initUI()
+        signalBus.dataReadySig.connect(self.on_data_ready)
+
+    def initUI(self):
+        self.main_layout = QVBoxLayout(self)
+        self.main_layout.setContentsMargins(30, 40, 30, 20)
+        self.main_layout.setSpacing(15)
+
+        self.title_label = SubtitleLabel(f'模型评估（{DEFAULT_FOLDS} 折交叉验证）', self)
+        self.main_layout.addWidget(self.title_label)
+
+        self.buttons_layout = QHBoxLayout()
+        # 评估按钮，数据加载完成后可用；指纹未变化的组合直接显示缓存结果
+        self.evaluate_button = PushButton('开始评估', self)
+        self.evaluate_button.setMaximumWidth(150)
+        self.evaluate_button.setEnabled(False)
+        self.evaluate_button.clicked.connect(self.on_evaluate_button_click)
+        self.buttons_layout.addWidget(self.evaluate_button)
+
+        self.cancel_button = PushButton('取消评估', self)
+        self.cancel_button.setMaximumWidth(150)
+        self.cancel_button.setEnabled(False)
+        self.cancel_button.clicked.connect(self.on_cancel_button_click)
+        self.buttons_layout.addWidget(self.cancel_button)
+
+        # 按哪个指标选出每种作物的最佳模型
+        self.metric_selector = ComboBox(self)
+        self.metric_selector.addItems(METRICS)
+        self.metric_selector.setMaximumWidth(150)
+        self.metric_selector.currentIndexChanged.connect(lambda index: self.show_results())
+        self.buttons_layout.addWidget(self.metric_selector)
+        self.buttons_layout.addStretch(1)
+        self.main_layout.addLayout(self.buttons_layout)
+
+        self.progress_bar = ProgressBar(self)
+        self.progress_bar.hide()
+        self.main_layout.addWidget(self.progress_bar)
+
+        self.table = TableWidget(self)
+        self.table.setBorderVisible(True)
+        self.table.setBorderRadius(8)
+        self.table.setWordWrap(False)
+        self.table.setEditTriggers(TableWidget.NoEditTriggers)
+        self.table.verticalHeader().hide()
+        self.headers = ['作物种类', '模型', 'MSE', 'MAE', 'R²', '行数', '最佳']
+        self.table.setColumnCount(len(self.headers))
+        self.table.setHorizontalHeaderLabels(self.headers)
+        self.main_layout.addWidget(self.table)
+
+    def on_data_ready(self):
+        self.evaluate_button.setEnabled(True)
+
+    def on_evaluate_button_click(self):
+        if self.predict_page.dataset is None:
+            return
+        self.evaluate_button.setEnabled(False)
+        self.eval_thread = EvaluateModelsThread(self.predict_page.dataset, MODEL_TYPES, cfg.get(cfg.trainWorkers))
+        self.eval_thread.progress_signal.connect(self.progress_bar.setValue)
+        self.eval_thread.finished_signal.connect(self.on_evaluation_finished)
+        self.eval_thread.error_signal.connect(self.on_evaluation_failed)
+        self.progress_bar.setValue(0)
+        self.progress_bar.show()
+        self.cancel_button.setEnabled(True)
+        self.eval_thread.start()
+
+    def on_cancel_button_click(self):
+        # 请求取消，正在评估的折完成后停止
+        self.cancel_button.setEnabled(False)
+        if self.eval_thread is not None:
+            self.eval_thread.stop()
+
+    def on_evaluation_failed(self, message):
+        InfoBar.error(
+            title='评估失败',
+            content=message,
+            orient=Qt.Vertical,
+            isClosable=True,
+            position=InfoBarPosition.TOP_RIGHT,
+            duration=5000,
+            parent=self
+        )
+
+    def on_evaluation_finished(self, results):
+        self.cancel_button.setEnabled(False)
+        self.progress_bar.hide()
+        self.evaluate_button.setEnabled(True)
+        # 出错时保留上次的结果，错误已由 on_evaluation_failed 提示
+        if results is None:
+            return
+        self.results = results
+        self.show_results()
+        InfoBar.success(
+            title='评估已取消' if self.eval_thread.cancelled() else '评估完成',
+            content=f"已评估 {len(results)} 个模型，结果已缓存！",
+            orient=Qt.Horizontal,
+            isClosable=True,
+            position=InfoBarPosition.TOP_RIGHT,
+            duration=2000,
+            parent=self
+        )
+
+    def show_results(self):
+        """ 按作物、模型类型排列结果，标出每种作物在所选指标上的最佳模型 """
+        best = best_model_types(self.results, self.metric_selector.currentText()) if self.results else {}
+        order = {model_type: i for i, model_type in enumerate(MODEL_TYPES)}
+        keys = sorted(self.results, key=lambda key: (key[0], order.get(key[1], len(order))))
+        self.table.setRowCount(len(keys))
+        for row, (crop, model_type) in enumerate(keys):
+            entry = self.results[(crop, model_type)]
+            values = [crop, MODEL_NAMES.get(model_type, model_type), f"{entry['MSE']:.4f}", f"{entry['MAE']:.4f}",
+                      f"{entry['R2']:.4f}", str(entry['rows']), '★' if best.get(crop) == model_type else '']
+            for column, value in enumerate(values):
+                self.table.setItem(row, column, QTableWidgetItem(value))
+        self.table.resizeColumnsToContents()
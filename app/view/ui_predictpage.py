@@ -1,17 +1,22 @@
 # -*- coding: utf-8 -*-
 from PySide6.QtWidgets import QApplication,QVBoxLayout,QSpacerItem,QSizePolicy
 from PySide6.QtGui import QIcon, QFont
-from qfluentwidgets import LineEdit, PushButton,ComboBox,InfoBar,InfoBarPosition,ToolTipFilter,ToolTipPosition
+from qfluentwidgets import LineEdit, PushButton,ComboBox,InfoBar,InfoBarPosition,ToolTipFilter,ToolTipPosition,IndeterminateProgressBar,CheckBox,ProgressBar
 from PySide6.QtWidgets import QWidget,QHBoxLayout
 from PySide6.QtCore import Qt, QThread, Signal
-from xgboost import XGBRegressor
-from sklearn.ensemble import RandomForestRegressor
-from sklearn.tree import DecisionTreeRegressor
-import joblib
 import os
-import pandas as pd
-from scipy.stats import zscore
-import time
+import threading
+from ..common.config import cfg
+from ..common.dataset import load_dataset, CropDataset
+from ..common.incremental import DatasetAppender, DirtyModels
+from ..common.schema import ValidationReport
+from ..common.tuning import TUNABLE_TYPES, tune_crops
+from ..common.prediction import ModelNotTrained, predict_yield
+from ..common.registry import ModelRegistry
+from ..common.training import (MODEL_TYPES, build_model, crop_model, model_steps, continue_steps, train_crops,
+                               train_global, crop_fingerprint, global_fingerprint, model_fingerprint,
+                               params_fingerprint)
+from ..common.signal_bus import signalBus
 
 # 设置中文字体和负号显示
 import matplotlib.pyplot as plt
@@ -28,13 +33,19 @@ def get_current_directory():
 # 模型训练线程
 class TrainModelsThread(QThread):
     progress_signal = Signal(int)  # 信号：用于更新进度条
-    finished_signal = Signal()  # 信号：表示线程完成
+    finished_signal = Signal(bool)  # 信号：表示线程完成，携带是否被取消
+    error_signal = Signal(str)  # 信号：训练出错，携带错误信息，之后仍会发出 finished_signal
 
-    def __init__(self, data_processed, model_type):
+    def __init__(self, dataset, model_types, workers=1, update=False, layout="PerCrop", storage="Mmap"):
         super().__init__()
-        self.data_processed = data_processed
-        self.model_type = model_type  # 模型类型
-        self._is_running = True  # 标志位：控制线程是否继续运行
+        self.dataset = dataset  # 按作物分块的训练数据
+        self.model_types = model_types  # 要训练的模型类型列表
+        self.workers = workers  # 并行训练的进程数
+        self.update = update  # 过期的模型在原模型上继续训练，而不是从头训练
+        self.layout = layout  # 每种作物一个模型，或所有作物共用一个全局模型
+        self.storage = storage  # 模型文件的存储方式
+        self._cancel = threading.Event()  # 设置后各训练进程在当前一批树或一轮提升结束时停止
+        self.failed = False  # 训练是否出错（如训练进程异常退出）
 
     def run(self):
         # 定义保存模型的文件夹为当前工作目录下的 "models"
@@ -42,61 +53,150 @@ class TrainModelsThread(QThread):
         if not os.path.exists(model_dir):
             os.makedirs(model_dir)
 
-        # 获取所有作物种类
-        crop_types = self.data_processed['作物种类'].unique()
-        total_crops = len(crop_types)
-
-        for idx, crop_type in enumerate(crop_types):
-            if not self._is_running:  # 检查线程是否需要停止
-                break
-
-            model_filename = os.path.join(model_dir, f"{self.model_type}_model_crop_{crop_type}.pkl")
-            if not os.path.exists(model_filename):  # 仅训练未保存的模型
-                crop_data = self.data_processed[self.data_processed['作物种类'] == crop_type]
-                X_crop = crop_data[['降雨量', '气温', 'ph值']]
-                y_crop = crop_data['产量']
-
-                # 创建模型
-                model = self.get_model()
-                model.fit(X_crop, y_crop)
-
-                # 保存模型
-                joblib.dump(model, model_filename)
-
-            # 更新进度信号
-            self.progress_signal.emit(int((idx + 1) / total_crops * 100))
-            time.sleep(0.01)  # 模拟训练时间延迟
-
-        self.finished_signal.emit()  # 发出完成信号
-
-    def get_model(self):
-        """根据用户选择返回相应的回归模型"""
-        if self.model_type == "RandomForest":
-            return RandomForestRegressor(n_estimators=100, random_state=42)
-        elif self.model_type == "DecisionTree":
-            return DecisionTreeRegressor(random_state=42)
-        elif self.model_type == "DecisionTreeOptimized":
-            # 使用之前优化得到的最佳超参数
-            best_params_cart = [20, 3, 1]  # 从粒子群优化得到的最佳超参数
-            return DecisionTreeRegressor(max_depth=best_params_cart[0], 
-                                              min_samples_split=best_params_cart[1], 
-                                              min_samples_leaf=best_params_cart[2], 
-                                              random_state=42)
-        elif self.model_type == "XGBoost":
-            return XGBRegressor(objective="reg:squarederror", random_state=42)
-        elif self.model_type == "XGBoostOptimized":
-            # 优化后的XGBoost超参数
-            best_params_xgb = [200, 10, 2, 0.09713775005616568] 
-            return XGBRegressor(n_estimators=int(best_params_xgb[0]),
-                                max_depth=int(best_params_xgb[1]),
-                                learning_rate=best_params_xgb[3],
-                                random_state=42)
+        try:
+            if self.layout == "Global":
+                self.run_global(model_dir)
+            else:
+                self.run_per_crop(model_dir)
+        except Exception as e:
+            self.failed = True
+            self.error_signal.emit(str(e))
+        # 无论是否出错都发出完成信号，使界面恢复按钮；已保存的模型保留
+        self.finished_signal.emit(self._cancel.is_set())
+
+    def run_per_crop(self, model_dir):
+        """ 每种作物一个模型 """
+        # 仅训练未保存、训练数据或超参数的指纹已变化的模型，同一作物的多种模型合并为一个任务
+        dirty_models = DirtyModels(model_dir)
+        registry = ModelRegistry(model_dir)
+        jobs = {}
+        for crop_type in self.dataset.crops:
+            data_digest = self.dataset.fingerprint(crop_type)
+            pending = [model_type for model_type in self.model_types
+                       if dirty_models.is_dirty(model_type, crop_type)
+                       or registry.is_stale(model_type, crop_type,
+                                            crop_fingerprint(model_dir, model_type, crop_type, data_digest))]
+            if pending:
+                jobs[crop_type] = pending
+
+        # 进度按随机森林的树数、XGBoost 的提升轮数计算，已是最新的模型不计入；
+        # 调优后各作物的提升轮数不同，按训练时实际使用的超参数计算
+        total_steps = 0
+        for crop_type, pending in jobs.items():
+            for model_type in pending:
+                model = crop_model(model_dir, model_type, crop_type)
+                fingerprint = model_fingerprint(self.dataset.fingerprint(crop_type), model)
+                if self.update and registry.can_continue(model_type, crop_type, fingerprint,
+                                                         params_fingerprint(model)):
+                    total_steps += continue_steps(model)
+                else:
+                    total_steps += model_steps(model)
+        done = 0
+        percent = -1
+
+        def on_progress(crop_type, model_type, step, saved):
+            nonlocal done, percent
+            if saved:
+                # 子进程已保存模型，在此清除过期标记
+                dirty_models.clear(model_type, crop_type)
+            done += step
+            # 只在百分比变化时发出信号，避免每轮提升都刷新界面
+            if int(done / total_steps * 100) != percent:
+                percent = int(done / total_steps * 100)
+                self.progress_signal.emit(percent)
+
+        if not total_steps:
+            self.progress_signal.emit(100)
         else:
-            raise ValueError(f"未知的模型类型: {self.model_type}")
+            on_progress(None, None, 0, False)
+        train_crops(self.dataset, jobs, model_dir, self.workers,
+                    progress=on_progress, cancel=self._cancel, update=self.update, mode=self.storage)
+
+    def run_global(self, model_dir):
+        """ 全局模型：每种模型类型只训练一个模型，任何作物的数据更新都需要重新训练 """
+        dirty_models = DirtyModels(model_dir)
+        registry = ModelRegistry(model_dir)
+        pending = [model_type for model_type in self.model_types
+                   if dirty_models.has_type(model_type)
+                   or registry.is_stale(model_type, None, global_fingerprint(model_type, self.dataset))]
+        total_steps = sum(model_steps(build_model(model_type)) for model_type in pending)
+        done = 0
+
+        def on_progress(model_type, step, saved):
+            nonlocal done
+            if saved:
+                dirty_models.clear_type(model_type)
+            done += step
+            self.progress_signal.emit(int(done / total_steps * 100) if total_steps else 100)
+
+        on_progress(None, 0, False)
+        train_global(self.dataset, pending, model_dir, self.workers, on_progress, self._cancel, mode=self.storage)
+
+    def stop(self):
+        """停止线程"""
+        self._cancel.set()
+
+
+# 超参数调优线程
+class TuneModelsThread(QThread):
+    progress_signal = Signal(int)  # 信号：已调优作物的百分比
+    finished_signal = Signal(bool, int)  # 信号：表示线程完成，携带是否被取消和跳过的作物数
+    error_signal = Signal(str)  # 信号：调优出错，携带错误信息，之后仍会发出 finished_signal
+
+    def __init__(self, dataset, model_type, method, time_budget, workers=1):
+        super().__init__()
+        self.dataset = dataset  # 按作物分块的训练数据
+        self.model_type = model_type  # 要调优的模型类型
+        self.method = method  # 搜索方式
+        self.time_budget = time_budget  # 全部作物的调优时间上限（秒）
+        self.workers = workers  # 并行评估候选的进程数
+        self._cancel = threading.Event()
+        self.failed = False  # 调优是否出错
+
+    def run(self):
+        model_dir = os.path.join(os.path.dirname(get_current_directory()), "models")
+        if not os.path.exists(model_dir):
+            os.makedirs(model_dir)
+
+        skipped = []
+        try:
+            _, skipped = tune_crops(self.dataset, model_dir, self.model_type, self.method, self.time_budget,
+                                    self.workers, self.on_progress, self._cancel)
+        except Exception as e:
+            self.failed = True
+            self.error_signal.emit(str(e))
+        # 无论是否出错都发出完成信号，使界面恢复按钮
+        self.finished_signal.emit(self._cancel.is_set(), len(skipped))
+
+    def on_progress(self, done, total):
+        self.progress_signal.emit(int(done / total * 100))
 
     def stop(self):
         """停止线程"""
-        self._is_running = False
+        self._cancel.set()
+
+
+class LoadDataThread(QThread):
+    finished_signal = Signal(object)  # 信号：加载完成，携带按作物分块的训练数据
+    error_signal = Signal(str)  # 信号：加载失败，携带错误信息
+    rejected_signal = Signal(str)  # 信号：有无法解析的行被拒绝，携带校验报告
+
+    def __init__(self, source, workers=1):
+        super().__init__()
+        self.source = source
+        self.workers = workers  # 并行读取的文件数
+
+    def run(self):
+        try:
+            # 清洗结果带缓存，源文件未变化时直接读取缓存
+            report = ValidationReport()
+            dataset = CropDataset.from_frame(load_dataset(self.source, workers=self.workers, report=report))
+        except Exception as e:
+            self.error_signal.emit(str(e))
+            return
+        if report:
+            self.rejected_signal.emit(str(report))
+        self.finished_signal.emit(dataset)
 
 
 # 主窗口类
@@ -108,8 +208,12 @@ class Ui_predictpage(object):
     def __init__(self):
         super().__init__()
         self.initUI()
-        self.load_data()
+        self.dataset = None  # 数据在后台线程中加载
+        self.load_thread = None
+        self.appender = None
         self.train_thread = None  # 初始化线程变量
+        signalBus.dataReadySig.connect(self.on_data_ready)
+        self.load_data()
         self.contents = [
             "你好",
             "在点击试试",
@@ -189,9 +293,43 @@ class Ui_predictpage(object):
         self.train_button.clicked.connect(self.on_train_all_models_button_click)
         self.buttons_layout.addWidget(self.train_button)
 
+        # 取消训练按钮，训练期间可用
+        self.cancel_button = PushButton('取消训练', self)
+        self.cancel_button.setMaximumWidth(150)
+        self.cancel_button.setEnabled(False)
+        self.cancel_button.clicked.connect(self.on_cancel_training_button_click)
+        self.buttons_layout.addWidget(self.cancel_button)
+
+        # 超参数调优按钮，只对优化后的模型类型可用
+        self.tune_button = PushButton('超参数调优', self)
+        self.tune_button.setToolTip('✨为每种作物分别搜索优化后模型的超参数,调优后重新预训练生效✨')
+        self.tune_button.installEventFilter(ToolTipFilter(self.tune_button, showDelay=1000, position=ToolTipPosition.TOP))
+        self.tune_button.setMaximumWidth(150)
+        self.tune_button.clicked.connect(self.on_tune_button_click)
+        self.buttons_layout.addWidget(self.tune_button)
+
         # 将按钮布局添加到内容布局
         self.content_layout.addLayout(self.buttons_layout)
 
+        # 勾选后预训练一次生成全部模型类型的模型
+        self.train_all_types_checkbox = CheckBox('训练全部模型类型', self)
+        self.content_layout.addWidget(self.train_all_types_checkbox)
+
+        # 勾选后数据更新过的模型在原模型上继续训练，不从头训练
+        self.update_models_checkbox = CheckBox('增量更新已有模型', self)
+        self.content_layout.addWidget(self.update_models_checkbox)
+
+        # 数据加载进度条，加载完成后隐藏
+        self.loading_bar = IndeterminateProgressBar(self)
+        self.loading_bar.setMaximumWidth(350)
+        self.content_layout.addWidget(self.loading_bar)
+
+        # 训练进度条，训练期间显示
+        self.train_progress_bar = ProgressBar(self)
+        self.train_progress_bar.setMaximumWidth(350)
+        self.train_progress_bar.hide()
+        self.content_layout.addWidget(self.train_progress_bar)
+
         # 显示结果的标签
         self.result_label = PushButton('预测结果将在此显示', self)
         self.result_label.setFont(QFont('Arial', 15, QFont.Bold))
@@ -221,22 +359,84 @@ class Ui_predictpage(object):
         self.move(window_geometry.topLeft())
 
     def load_data(self):
-        # 加载并处理数据
-        file_path = os.path.join(os.path.dirname(get_current_directory()), 'product_regressiondb.csv')
-
-        self.data = pd.read_csv(file_path)
-        self.data.rename(columns={'Rainfall': '降雨量', 'Temperature': '气温', 'Ph': 'ph值', 'Crop': '作物种类', 'Production': '产量'}, inplace=True)
-        self.data.drop_duplicates(inplace=True)
-        self.data.reset_index(drop=True, inplace=True)
-
-        self.data_cleaned = pd.DataFrame()
-        groups = self.data.groupby('作物种类')
-        for crop, group in groups:
-            z_scores = group[['降雨量', '气温', 'ph值', '产量']].apply(zscore)
-            outliers = (z_scores > 3) | (z_scores < -3)
-            group_cleaned = group[~outliers.any(axis=1)]
-            self.data_cleaned = pd.concat([self.data_cleaned, group_cleaned])
-        self.data_processed = self.data_cleaned
+        # 加载并处理数据，数据源可在设置中配置为 CSV 文件、通配符或分区目录
+        default_path = os.path.join(os.path.dirname(get_current_directory()), 'product_regressiondb.csv')
+        source = cfg.get(cfg.dataSource) or default_path
+
+        # 数据就绪前禁用预测和训练
+        self.predict_button.setEnabled(False)
+        self.train_button.setEnabled(False)
+        self.tune_button.setEnabled(False)
+        self.result_label.setText('数据加载中...')
+        self.loading_bar.show()
+        self.loading_bar.start()
+
+        self.appender = DatasetAppender(source)
+
+        # 在后台线程中读取和清洗数据，避免阻塞窗口显示
+        self.load_thread = LoadDataThread(source, cfg.get(cfg.readWorkers))
+        self.load_thread.finished_signal.connect(self.on_data_loaded)
+        self.load_thread.error_signal.connect(self.on_data_load_failed)
+        self.load_thread.rejected_signal.connect(self.on_rows_rejected)
+        self.load_thread.start()
+
+    def on_data_loaded(self, dataset):
+        self.dataset = dataset
+        signalBus.dataReadySig.emit()
+        InfoBar.success(
+            title='数据加载完成',
+            content=f"共 {len(dataset)} 行，占用内存 {dataset.nbytes / 1024 ** 2:.1f} MB",
+            orient=Qt.Horizontal,
+            isClosable=True,
+            position=InfoBarPosition.TOP_RIGHT,
+            duration=3000,
+            parent=self
+        )
+
+    def on_data_ready(self):
+        # 数据就绪，恢复按钮
+        self.loading_bar.stop()
+        self.loading_bar.hide()
+        self.result_label.setText('预测结果将在此显示')
+        self.predict_button.setEnabled(True)
+        self.train_button.setEnabled(True)
+        self.tune_button.setEnabled(True)
+
+    def on_data_load_failed(self, message):
+        self.loading_bar.error()
+        self.result_label.setText('数据加载失败')
+        InfoBar.error(
+            title='数据加载失败',
+            content=message,
+            orient=Qt.Vertical,
+            isClosable=True,
+            position=InfoBarPosition.TOP_RIGHT,
+            duration=5000,
+            parent=self
+        )
+
+    def on_rows_rejected(self, report):
+        InfoBar.warning(
+            title='部分数据已忽略',
+            content=report.splitlines()[0],
+            orient=Qt.Vertical,
+            isClosable=True,
+            position=InfoBarPosition.TOP_RIGHT,
+            duration=5000,
+            parent=self
+        )
+
+    def append_data(self, rows):
+        """ 追加新的产量记录，并把受影响作物的全部模型标记为需要重新训练
+
+        rows 使用源文件的列名 (Rainfall/Temperature/Ph/Crop/Production)，返回受影响的作物种类
+        """
+        self.dataset, crops = self.appender.append(self.dataset, rows)
+        model_dir = os.path.join(os.path.dirname(get_current_directory()), "models")
+        if not os.path.exists(model_dir):
+            os.makedirs(model_dir)
+        DirtyModels(model_dir).mark(crops)
+        return crops
 
     def get_selected_model_type(self):
         """获取用户选择的模型类型"""
@@ -288,6 +488,17 @@ class Ui_predictpage(object):
                 duration=2000,
                 parent=self
         )
+        except ModelNotTrained:
+            # 全局模型的训练耗时较长，只在预训练线程中进行，不阻塞界面
+            InfoBar.warning(
+                title='需要预训练',
+                content="全局模型尚未训练或训练数据已变化，请先预训练模型！",
+                orient=Qt.Vertical,
+                isClosable=True,
+                position=InfoBarPosition.TOP_RIGHT,
+                duration=3000,
+                parent=self
+            )
         
         
     def get_next_content(self):
@@ -298,65 +509,12 @@ class Ui_predictpage(object):
 
     def predict_yield(self, rainfall, temperature, ph_value, crop_type, model_type):
         model_dir = os.path.join(os.path.dirname(get_current_directory()), "models")
-        
-        if crop_type not in self.data_processed['作物种类'].unique():
-            raise KeyError("无效的作物种类")
-
         if not os.path.exists(model_dir):
             os.makedirs(model_dir)
+        # 作物的模型不存在或训练数据、超参数已变化时先重新训练，全局模型须先预训练，见 prediction.predict_yield
+        return predict_yield(model_dir, self.dataset, model_type, crop_type, rainfall, temperature, ph_value,
+                             layout=cfg.get(cfg.modelLayout), mode=cfg.get(cfg.modelStorage))
 
-        model_filename = os.path.join(model_dir, f"{model_type}_model_crop_{crop_type}.pkl")
-
-        if os.path.exists(model_filename):
-            model = joblib.load(model_filename)
-        else:
-            return self.retrain_and_predict(rainfall, temperature, ph_value, crop_type, model_type)
-
-        input_data = pd.DataFrame([[rainfall, temperature, ph_value]], columns=['降雨量', '气温', 'ph值'])
-        predicted_yield = model.predict(input_data)
-        return predicted_yield[0]
-
-    def retrain_and_predict(self, rainfall, temperature, ph_value, crop_type, model_type):
-        crop_data = self.data_processed[self.data_processed['作物种类'] == crop_type]
-        X_crop = crop_data[['降雨量', '气温', 'ph值']]
-        y_crop = crop_data['产量']
-
-        # 根据模型类型获取相应的模型
-        if model_type == "RandomForest":
-            model = RandomForestRegressor(n_estimators=100, random_state=42)
-        elif model_type == "DecisionTree":
-            model = DecisionTreeRegressor(random_state=42)
-        elif model_type == "XGBoost":
-            model = XGBRegressor(objective="reg:squarederror", random_state=42)
-        elif model_type == "DecisionTreeOptimized":
-             # 使用之前优化得到的最佳超参数
-            best_params_cart = [20, 3, 1]  # 从粒子群优化得到的最佳超参数
-            model= DecisionTreeRegressor(max_depth=best_params_cart[0], 
-                                              min_samples_split=best_params_cart[1], 
-                                              min_samples_leaf=best_params_cart[2], 
-                                              random_state=42)
-        elif model_type == "XGBoostOptimized":
-            best_params_xgb = [200, 10, 2, 0.09713775005616568] 
-            model = XGBRegressor(n_estimators=int(best_params_xgb[0]),
-                                 max_depth=int(best_params_xgb[1]),
-                                 learning_rate=best_params_xgb[3],
-                                 random_state=42)
-        else:
-            raise ValueError(f"未知的模型类型: {model_type}")
-
-        # 训练模型
-        model.fit(X_crop, y_crop)
-
-        # 保存模型
-        model_dir = os.path.join(os.path.dirname(get_current_directory()), "models")
-        model_filename = os.path.join(model_dir, f"{model_type}_model_crop_{crop_type}.pkl")
-        joblib.dump(model, model_filename)
-
-        # 返回预测结果
-        input_data = pd.DataFrame([[rainfall, temperature, ph_value]], columns=['降雨量', '气温', 'ph值'])
-        predicted_yield = model.predict(input_data)
-        return predicted_yield[0]
-    
     def on_result_label_button_click(self):
         content = self.get_next_content()
         InfoBar.info(
@@ -371,6 +529,7 @@ class Ui_predictpage(object):
     def on_train_all_models_button_click(self):
         # 禁用按钮
         self.train_button.setEnabled(False)
+        self.tune_button.setEnabled(False)
     
         # 提示训练开始
         InfoBar.info(
@@ -384,30 +543,133 @@ class Ui_predictpage(object):
         )
 
         # 获取用户选择的模型类型
-        model_type = self.get_selected_model_type()
+        if self.train_all_types_checkbox.isChecked():
+            model_types = MODEL_TYPES
+        else:
+            model_types = [self.get_selected_model_type()]
     
         # 启动模型训练
-        self.train_thread = TrainModelsThread(self.data_processed, model_type)
+        self.train_thread = TrainModelsThread(self.dataset, model_types, cfg.get(cfg.trainWorkers),
+                                              update=self.update_models_checkbox.isChecked(),
+                                              layout=cfg.get(cfg.modelLayout),
+                                              storage=cfg.get(cfg.modelStorage))
     
-        # 连接信号：训练完成后调用 on_training_finished
+        # 连接信号：进度更新到进度条，训练完成后调用 on_training_finished
+        self.train_thread.progress_signal.connect(self.train_progress_bar.setValue)
         self.train_thread.finished_signal.connect(self.on_training_finished)
+        self.train_thread.error_signal.connect(self.on_training_failed)
+        self.train_progress_bar.setValue(0)
+        self.train_progress_bar.show()
+        self.cancel_button.setEnabled(True)
     
         # 启动线程
         self.train_thread.start()
 
-    def on_training_finished(self):
-        # 提示训练完成
-        InfoBar.success(
-            title='训练完成',
-            content="模型训练完成！",
-            orient=Qt.Horizontal,
+    def on_tune_button_click(self):
+        model_type = self.get_selected_model_type()
+        if model_type not in TUNABLE_TYPES:
+            InfoBar.warning(
+                title='无法调优',
+                content="请选择优化后的CART决策树或XGBoost模型！",
+                orient=Qt.Horizontal,
+                isClosable=True,
+                position=InfoBarPosition.TOP_RIGHT,
+                duration=2000,
+                parent=self
+            )
+            return
+
+        self.train_button.setEnabled(False)
+        self.tune_button.setEnabled(False)
+        self.train_thread = TuneModelsThread(self.dataset, model_type, cfg.get(cfg.tuneMethod),
+                                             cfg.get(cfg.tuneTimeBudget), cfg.get(cfg.trainWorkers))
+        self.train_thread.progress_signal.connect(self.train_progress_bar.setValue)
+        self.train_thread.finished_signal.connect(self.on_tuning_finished)
+        self.train_thread.error_signal.connect(self.on_tuning_failed)
+        self.train_progress_bar.setValue(0)
+        self.train_progress_bar.show()
+        self.cancel_button.setEnabled(True)
+        self.train_thread.start()
+
+    def on_tuning_failed(self, message):
+        InfoBar.error(
+            title='调优失败',
+            content=message,
+            orient=Qt.Vertical,
             isClosable=True,
             position=InfoBarPosition.TOP_RIGHT,
-            duration=2000,  # 提示显示时间（毫秒）
+            duration=5000,
             parent=self
         )
+
+    def on_tuning_finished(self, cancelled, skipped):
+        self.cancel_button.setEnabled(False)
+        self.train_progress_bar.hide()
+        content = "已调优作物的模型将在下次预训练时按新的超参数重新训练！"
+        if skipped:
+            content += f"\n{skipped} 种作物数据过少或在时间预算内未完成评估，已跳过。"
+        # 出错时已由 on_tuning_failed 提示
+        if not self.train_thread.failed:
+            InfoBar.info(
+                title='调优已取消' if cancelled else '调优完成',
+                content=content,
+                orient=Qt.Horizontal,
+                isClosable=True,
+                position=InfoBarPosition.TOP_RIGHT,
+                duration=3000,
+                parent=self
+            )
+        self.train_button.setEnabled(True)
+        self.tune_button.setEnabled(True)
+
+    def on_cancel_training_button_click(self):
+        # 请求取消，正在训练的模型在当前一批树或一轮提升结束后停止
+        self.cancel_button.setEnabled(False)
+        if self.train_thread is not None:
+            self.train_thread.stop()
+
+    def on_training_failed(self, message):
+        InfoBar.error(
+            title='训练失败',
+            content=message + "\n已完成的模型已保存！",
+            orient=Qt.Vertical,
+            isClosable=True,
+            position=InfoBarPosition.TOP_RIGHT,
+            duration=5000,
+            parent=self
+        )
+
+    def on_training_finished(self, cancelled):
+        self.cancel_button.setEnabled(False)
+        self.train_progress_bar.hide()
+        if self.train_thread.failed:
+            # 错误已由 on_training_failed 提示
+            pass
+        elif cancelled:
+            # 已完成的模型保留，下次预训练时只训练剩下的模型
+            InfoBar.warning(
+                title='训练已取消',
+                content="已完成的模型已保存！",
+                orient=Qt.Horizontal,
+                isClosable=True,
+                position=InfoBarPosition.TOP_RIGHT,
+                duration=2000,
+                parent=self
+            )
+        else:
+            # 提示训练完成
+            InfoBar.success(
+                title='训练完成',
+                content="模型训练完成！",
+                orient=Qt.Horizontal,
+                isClosable=True,
+                position=InfoBarPosition.TOP_RIGHT,
+                duration=2000,  # 提示显示时间（毫秒）
+                parent=self
+            )
         # 启用按钮
         self.train_button.setEnabled(True)
+        self.tune_button.setEnabled(True)
 
 
 
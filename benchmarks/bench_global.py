@@ -0,0 +1,88 @@
+# coding: utf-8
+"""
+模型布局基准测试：每种作物一个模型 vs 所有作物共用一个全局模型 (GlobalModel)
+
+比较训练耗时、模型文件大小、加载一个模型的耗时，以及在留出测试集上按作物计算的 MAE
+（平均值和最差的作物）。
+
+在仓库根目录运行:
+    python -m benchmarks.bench_global
+    python -m benchmarks.bench_global --rows 500000 --crops 100 --models XGBoost DecisionTree
+"""
+import argparse
+import os
+import tempfile
+import time
+
+import joblib
+import numpy as np
+import pandas as pd
+
+from app.common.dataset import COLUMN_MAP, FEATURE_COLUMNS, CropDataset, compact
+from app.common.training import GlobalModel, build_model, fit_model
+from benchmarks import synthetic
+
+
+def make_frame(rows, crops, seed=0):
+    """ 每种作物的产量与降雨量、气温、pH 的关系系数不同，不含异常值和重复行 """
+    return synthetic.make_frame(rows, crops, outlier_rate=0, seed=seed).rename(columns=COLUMN_MAP)
+
+
+def file_size(path):
+    return os.path.getsize(path) / 1024 ** 2
+
+
+def timed(func):
+    start = time.perf_counter()
+    result = func()
+    return time.perf_counter() - start, result
+
+
+def per_crop_mae(predict, test):
+    errors = [np.mean(np.abs(predict(*test.arrays(crop)[:1], crop) - test.arrays(crop)[1])) for crop in test.crops]
+    return float(np.mean(errors)), float(np.max(errors))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=200_000)
+    parser.add_argument('--crops', type=int, default=50)
+    parser.add_argument('--models', nargs='+', default=['RandomForest', 'DecisionTree', 'XGBoost'])
+    args = parser.parse_args()
+
+    data = compact(make_frame(args.rows, args.crops))
+    test_mask = np.random.default_rng(1).random(len(data)) < 0.2
+    train = CropDataset.from_frame(data[~test_mask])
+    test = CropDataset.from_frame(data[test_mask])
+
+    print(f"{'model':>14} {'layout':>9} {'train (s)':>10} {'size (MB)':>10} {'load (ms)':>10} "
+          f"{'MAE mean':>9} {'MAE worst':>10}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for model_type in args.models:
+            # 每种作物一个模型
+            def train_per_crop():
+                return {crop: fit_model(build_model(model_type), pd.DataFrame(train.arrays(crop)[0], columns=FEATURE_COLUMNS),
+                                        train.arrays(crop)[1]) for crop in train.crops}
+            train_time, models = timed(train_per_crop)
+            paths = {crop: os.path.join(tmp, f'{model_type}_{crop}.pkl') for crop in models}
+            for crop, model in models.items():
+                joblib.dump(model, paths[crop])
+            size = sum(file_size(path) for path in paths.values())
+            load_time = np.mean([timed(lambda: joblib.load(path))[0] for path in paths.values()])
+            mean_mae, worst_mae = per_crop_mae(
+                lambda X, crop: models[crop].predict(pd.DataFrame(X, columns=FEATURE_COLUMNS)), test)
+            print(f"{model_type:>14} {'per-crop':>9} {train_time:>10.2f} {size:>10.2f} {load_time * 1000:>10.2f} "
+                  f"{mean_mae:>9.4f} {worst_mae:>10.4f}")
+
+            # 所有作物共用一个模型
+            train_time, model = timed(lambda: GlobalModel(model_type, train.crops).fit(train))
+            path = os.path.join(tmp, f'{model_type}_global.pkl')
+            joblib.dump(model, path)
+            load_time, _ = timed(lambda: joblib.load(path))
+            mean_mae, worst_mae = per_crop_mae(model.predict, test)
+            print(f"{model_type:>14} {'global':>9} {train_time:>10.2f} {file_size(path):>10.2f} "
+                  f"{load_time * 1000:>10.2f} {mean_mae:>9.4f} {worst_mae:>10.4f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,98 @@
+# coding: utf-8
+"""
+CSV 解析基准测试：旧版 pd.read_csv(全部列、自动推断类型) vs 按 SCHEMA 裁剪列并指定类型
+
+每种解析方式在独立的子进程中运行，分别统计解析耗时、结果占用内存和进程峰值内存
+（峰值内存依赖 resource 模块，Windows 上不可用）。
+
+在仓库根目录运行:
+    python -m benchmarks.bench_parse
+    python -m benchmarks.bench_parse --rows 1000000 --extra-columns 10
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+import pandas as pd
+
+from app.common import schema
+from benchmarks import synthetic
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+
+def legacy(path):
+    """ 旧版 load_data 中的读取方式 """
+    return pd.read_csv(path)
+
+
+def typed_c(path):
+    columns = [column for column in schema.SCHEMA if column in pd.read_csv(path, nrows=0).columns]
+    return pd.read_csv(path, usecols=columns, dtype=schema.SCHEMA, engine='c')
+
+
+def typed(path):
+    """ 当前实现：可用时使用 pyarrow 引擎 """
+    return schema.read_file(path)
+
+
+VARIANTS = {'legacy': legacy, 'typed-c': typed_c, 'typed-' + schema.ENGINE: typed}
+
+
+def write_csv(path, rows, crops, extra_columns):
+    """ 生成使用源文件列名的 CSV，并附带若干不参与建模的列 """
+    data = synthetic.make_frame(rows, crops)
+    data['Crop'] = data['Crop'].astype(str)
+    for i in range(extra_columns):
+        data[f'Extra{i}'] = data['Rainfall'] * (i + 1) if i % 2 else data['Crop'] + f'_{i}'
+    data.to_csv(path, index=False)
+
+
+def run_variant(name, path, repeat):
+    """ 子进程入口：输出一行 JSON """
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        data = VARIANTS[name](path)
+        best = min(best, time.perf_counter() - start)
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024 if resource else None
+    print(json.dumps({'seconds': best, 'frame_mb': data.memory_usage(deep=True).sum() / 1024 ** 2, 'peak_mb': peak}))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, nargs='+', default=[100_000, 1_000_000, 5_000_000])
+    parser.add_argument('--crops', type=int, default=50)
+    parser.add_argument('--extra-columns', type=int, default=4)
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--run', nargs=2, metavar=('VARIANT', 'CSV'), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.run:
+        run_variant(args.run[0], args.run[1], args.repeat)
+        return
+
+    print(f"{'rows':>12} {'variant':>14} {'parse (s)':>10} {'frame (MB)':>11} {'peak (MB)':>10}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for rows in args.rows:
+            path = os.path.join(tmp, f'{rows}.csv')
+            write_csv(path, rows, args.crops, args.extra_columns)
+            repeat = args.repeat if rows <= 1_000_000 else 1
+            for name in VARIANTS:
+                output = subprocess.run(
+                    [sys.executable, '-m', 'benchmarks.bench_parse', '--repeat', str(repeat), '--run', name, path],
+                    check=True, capture_output=True, text=True).stdout
+                result = json.loads(output.splitlines()[-1])
+                peak = f"{result['peak_mb']:>10.1f}" if result['peak_mb'] is not None else f"{'-':>10}"
+                print(f"{rows:>12,} {name:>14} {result['seconds']:>10.3f} {result['frame_mb']:>11.1f} {peak}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,103 @@
+# coding: utf-8
+"""
+模型存储方式基准测试：各模型类型在不同存储方式 (storage.STORAGE_MODES) 下的文件大小、读取耗时和内存占用
+
+在合成数据中数据最多的作物上训练每种模型，按每种存储方式保存后，在独立的子进程中读取：
+耗时取 --repeat 次中的最小值，内存为第一次读取前后常驻内存的增量（Linux 上读取 /proc/self/statm，
+其余系统为最大常驻内存的增量，Windows 上为空）。
+未安装 lz4 时 LZ4 实际以 Zlib 保存，表中标出实际使用的方式。
+XGBoost 模型另外以原生 UBJSON 格式保存并读入为 XGBoostPredictor，与 pickle（Mmap 等行）对比。
+
+在仓库根目录运行:
+    python -m benchmarks.bench_storage
+    python -m benchmarks.bench_storage --rows 2000000 --crops 10 --models RandomForest DecisionTree
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+from app.common import storage
+from app.common.dataset import CropDataset, load_dataset
+from app.common.training import MODEL_TYPES, NATIVE_TYPES, build_model, fit_model
+from benchmarks import synthetic
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+
+def rss_mb():
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') / 1024 ** 2
+    except OSError:
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024 if resource else None
+
+
+def run_load(filename, mode, repeat):
+    """ 子进程入口：输出一行 JSON """
+    before = rss_mb()
+    start = time.perf_counter()
+    model = storage.load(filename, mode)
+    best = time.perf_counter() - start
+    rss = rss_mb() - before if before is not None else None
+    del model
+    for _ in range(repeat - 1):
+        start = time.perf_counter()
+        storage.load(filename, mode)
+        best = min(best, time.perf_counter() - start)
+    print(json.dumps({'seconds': best, 'rss_mb': rss}))
+
+
+def measure(filename, mode, repeat):
+    command = [sys.executable, '-m', 'benchmarks.bench_storage', '--run', filename, mode, '--repeat', str(repeat)]
+    output = subprocess.run(command, check=True, capture_output=True, text=True).stdout
+    return json.loads(output.splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=1_000_000)
+    parser.add_argument('--crops', type=int, default=10)
+    parser.add_argument('--models', nargs='+', default=MODEL_TYPES, choices=MODEL_TYPES)
+    parser.add_argument('--modes', nargs='+', default=storage.STORAGE_MODES, choices=storage.STORAGE_MODES)
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--run', nargs=2, metavar=('FILE', 'MODE'), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.run:
+        run_load(*args.run, args.repeat)
+        return
+
+    with tempfile.TemporaryDirectory() as tmp:
+        csv = os.path.join(tmp, 'data.csv')
+        synthetic.write_csv(csv, args.rows, args.crops)
+        dataset = CropDataset.from_frame(load_dataset(csv, use_cache=False))
+        crop = max(dataset.crops, key=lambda crop: len(dataset.arrays(crop)[1]))
+        X, y = dataset.slice(crop)
+        print(f"{len(y):,} rows of {crop}")
+        print(f"{'model':>22} {'mode':>10} {'size (MB)':>10} {'dump (s)':>9} {'load (s)':>9} {'RSS (MB)':>9}")
+        for model_type in args.models:
+            model = fit_model(build_model(model_type), X, y)
+            native = [storage.NATIVE_MODE] if model_type in NATIVE_TYPES else []
+            for mode in args.modes + native:
+                extension = storage.NATIVE_EXTENSION if mode == storage.NATIVE_MODE else '.pkl'
+                filename = os.path.join(tmp, f'{model_type}_{mode}{extension}')
+                start = time.perf_counter()
+                used = storage.dump(model, filename, mode)
+                dump_seconds = time.perf_counter() - start
+                result = measure(filename, used, args.repeat)
+                rss = f"{result['rss_mb']:>9.1f}" if result['rss_mb'] is not None else f"{'-':>9}"
+                label = mode if used == mode else f"{mode}->{used}"
+                print(f"{model_type:>22} {label:>10} {os.path.getsize(filename) / 1024 ** 2:>10.1f} "
+                      f"{dump_seconds:>9.2f} {result['seconds']:>9.3f} {rss}", flush=True)
+            del model
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,72 @@
+# coding: utf-8
+"""
+增量更新基准测试：在已有模型上继续训练 (continue_model) vs 用全部数据重新训练
+
+模拟一种作物的数据：旧数据训练出初始模型后追加一批新数据，新数据的产量关系有所漂移。
+分别报告不更新、增量更新和完整重新训练的耗时及在新分布测试集上的 RMSE。
+
+在仓库根目录运行:
+    python -m benchmarks.bench_update
+    python -m benchmarks.bench_update --rows 200000 --new-fraction 0.05 --models XGBoost
+"""
+import argparse
+import copy
+import time
+
+import numpy as np
+import pandas as pd
+
+from app.common.dataset import FEATURE_COLUMNS
+from app.common.training import build_model, continue_model, fit_model
+
+
+def make_rows(rows, rng, drift=0.0):
+    """ 产量与降雨量、气温、pH 相关的随机数据，drift 使产量关系整体偏移 """
+    X = pd.DataFrame({
+        FEATURE_COLUMNS[0]: rng.normal(1000, 200, rows),
+        FEATURE_COLUMNS[1]: rng.normal(25, 5, rows),
+        FEATURE_COLUMNS[2]: rng.normal(6.5, 0.5, rows),
+    }).astype('float32')
+    y = (X.iloc[:, 0] / 200 + np.sin(X.iloc[:, 1] / 3) * 2 - (X.iloc[:, 2] - 6.5) ** 2
+         + drift * (X.iloc[:, 1] - 25) / 5 + rng.normal(0, 0.3, rows))
+    return X, y.to_numpy(dtype='float32')
+
+
+def rmse(model, X, y):
+    return float(np.sqrt(np.mean((model.predict(X) - y) ** 2)))
+
+
+def timed(func):
+    start = time.perf_counter()
+    result = func()
+    return time.perf_counter() - start, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=100_000)
+    parser.add_argument('--new-fraction', type=float, default=0.1)
+    parser.add_argument('--drift', type=float, default=1.0)
+    parser.add_argument('--models', nargs='+', default=['RandomForest', 'XGBoost', 'XGBoostOptimized'])
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    new_rows = int(args.rows * args.new_fraction)
+    X_old, y_old = make_rows(args.rows - new_rows, rng)
+    X_new, y_new = make_rows(new_rows, rng, args.drift)
+    X_test, y_test = make_rows(20_000, rng, args.drift)
+    X_all, y_all = pd.concat([X_old, X_new], ignore_index=True), np.concatenate([y_old, y_new])
+
+    print(f"{'model':>18} {'stale RMSE':>11} {'update (s)':>11} {'update RMSE':>12} "
+          f"{'retrain (s)':>12} {'retrain RMSE':>13} {'speedup':>8}")
+    for model_type in args.models:
+        base = fit_model(build_model(model_type), X_old, y_old)
+        update_time, updated = timed(lambda: continue_model(copy.deepcopy(base), build_model(model_type), X_all, y_all))
+        retrain_time, retrained = timed(lambda: fit_model(build_model(model_type), X_all, y_all))
+        print(f"{model_type:>18} {rmse(base, X_test, y_test):>11.4f} {update_time:>11.2f} "
+              f"{rmse(updated, X_test, y_test):>12.4f} {retrain_time:>12.2f} {rmse(retrained, X_test, y_test):>13.4f} "
+              f"{retrain_time / update_time:>7.1f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,203 @@
+# coding: utf-8
+"""
+性能基准测试套件：在不同规模的合成数据上测量加载、训练、模型读取和预测的耗时与内存
+
+测量的路径（与界面中的调用一致）:
+    load         load_dataset 读取并清洗 CSV（不使用缓存）并构建 CropDataset
+    train        train_crops 为全部作物训练一种模型（即 TrainModelsThread 的工作）
+    joblib_load  storage.load 读取数据最多的作物的模型文件（XGBoost 为原生格式）
+    predict      prediction.predict_yield 使用已训练的模型预测一次（含过期检查）
+
+每个测量在独立的子进程中运行：耗时取 --repeat 次中的最小值（读取和预测为连续多次调用的平均值），之后再运行一次并用 tracemalloc
+统计该操作期间的峰值内存（peak_mb），另记录子进程的最大常驻内存（max_rss_mb，Windows 上为空）。
+结果写入 JSON；指定 --baseline 时与之前保存的结果比较，耗时或峰值内存超过基线的 (1 + tolerance) 倍
+视为退化，此时以状态码 1 退出。
+
+在仓库根目录运行:
+    python -m benchmarks.suite --output benchmarks/baseline.json
+    python -m benchmarks.suite --baseline benchmarks/baseline.json --output results.json
+    python -m benchmarks.suite --rows 100000 1000000 --models RandomForest XGBoost --tolerance 0.1
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+from app.common import storage
+from app.common.dataset import CropDataset, load_dataset
+from app.common.prediction import predict_yield
+from app.common.registry import ModelRegistry
+from app.common.training import MODEL_TYPES, model_path, train_crops
+from benchmarks import synthetic
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+
+CASES = ['load', 'train', 'joblib_load', 'predict']
+# 比较结果时检查的指标
+METRICS = ['seconds', 'peak_mb']
+# 读取模型和预测一次耗时很短，每次计时连续调用的次数
+REPEATED_CALLS = {'joblib_load': 10, 'predict': 100}
+
+
+def largest_crop(dataset):
+    return max(dataset.crops, key=lambda crop: len(dataset.arrays(crop)[1]))
+
+
+def case_operation(case, model_type, csv, model_dir, workers):
+    """ 返回一次调用待测路径的函数，准备工作（如读取缓存的数据集）不计入耗时 """
+    if case == 'load':
+        return lambda: CropDataset.from_frame(load_dataset(csv, use_cache=False))
+    dataset = CropDataset.from_frame(load_dataset(csv))
+    crop = largest_crop(dataset)
+    if case == 'train':
+        jobs = {crop: [model_type] for crop in dataset.crops}
+        return lambda: train_crops(dataset, jobs, model_dir, workers)
+    if case == 'joblib_load':
+        filename = model_path(model_dir, model_type, crop)
+        return lambda: storage.load(filename, ModelRegistry(model_dir).storage(model_type, crop))
+    if case == 'predict':
+        # 第一次调用计算并缓存数据摘要，与界面中连续预测的情况一致
+        predict_yield(model_dir, dataset, model_type, crop, 1000.0, 25.0, 6.5)
+        return lambda: predict_yield(model_dir, dataset, model_type, crop, 1000.0, 25.0, 6.5)
+    raise ValueError(f"未知的测量: {case}")
+
+
+def run_case(case, model_type, csv, model_dir, repeat, workers):
+    """ 子进程入口：输出一行 JSON """
+    operation = case_operation(case, model_type, csv, model_dir, workers)
+    calls = REPEATED_CALLS.get(case, 1)
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(calls):
+            operation()
+        best = min(best, time.perf_counter() - start)
+    # tracemalloc 会拖慢分配密集的代码，内存单独测量一次
+    tracemalloc.start()
+    operation()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024 if resource else None
+    print(json.dumps({'seconds': best / calls, 'peak_mb': peak / 1024 ** 2, 'max_rss_mb': max_rss}))
+
+
+def measure(case, model_type, csv, model_dir, repeat, workers):
+    command = [sys.executable, '-m', 'benchmarks.suite', '--run', case, model_type or '-', csv, model_dir,
+               '--repeat', str(repeat), '--workers', str(workers)]
+    output = subprocess.run(command, check=True, capture_output=True, text=True).stdout
+    return json.loads(output.splitlines()[-1])
+
+
+def environment():
+    """ 结果所在的环境，不同机器上的结果不宜直接比较 """
+    import numpy, pandas, sklearn, xgboost
+    return {
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'machine': platform.machine(),
+        'cpu_count': os.cpu_count(),
+        'numpy': numpy.__version__,
+        'pandas': pandas.__version__,
+        'sklearn': sklearn.__version__,
+        'xgboost': xgboost.__version__,
+        'timestamp': time.strftime('%Y-%m-%d %H:%M:%S'),
+    }
+
+
+def result_key(result):
+    return result['case'], result['model_type'], result['rows']
+
+
+def compare(results, baseline, tolerance):
+    """ 打印与基线的对比，返回退化的结果数 """
+    previous = {result_key(result): result for result in baseline['results']}
+    current = environment()
+    changed = [key for key in ('machine', 'cpu_count', 'numpy', 'pandas', 'sklearn', 'xgboost')
+               if baseline.get('environment', {}).get(key) != current[key]]
+    if changed:
+        print(f"warning: baseline was recorded in a different environment ({', '.join(changed)})")
+    regressions = 0
+    print(f"\n{'case':>12} {'model':>22} {'rows':>11} {'metric':>8} {'baseline':>10} {'current':>10} {'ratio':>7}")
+    for result in results:
+        base = previous.get(result_key(result))
+        if base is None:
+            continue
+        for metric in METRICS:
+            if not base.get(metric):
+                continue
+            ratio = result[metric] / base[metric]
+            regressed = ratio > 1 + tolerance
+            regressions += regressed
+            print(f"{result['case']:>12} {result['model_type'] or '-':>22} {result['rows']:>11,} {metric:>8} "
+                  f"{base[metric]:>10.4g} {result[metric]:>10.4g} {ratio:>6.2f}x{'  REGRESSION' if regressed else ''}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, nargs='+', default=[100_000, 1_000_000])
+    parser.add_argument('--crops', type=int, default=50)
+    parser.add_argument('--models', nargs='+', default=MODEL_TYPES, choices=MODEL_TYPES)
+    parser.add_argument('--cases', nargs='+', default=CASES, choices=CASES)
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--workers', type=int, default=1, help='训练的进程数')
+    parser.add_argument('--output', help='结果写入的 JSON 文件')
+    parser.add_argument('--baseline', help='作为比较基准的结果 JSON 文件')
+    parser.add_argument('--tolerance', type=float, default=0.25, help='允许的相对退化幅度')
+    parser.add_argument('--run', nargs=4, metavar=('CASE', 'MODEL', 'CSV', 'MODEL_DIR'), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.run:
+        case, model_type, csv, model_dir = args.run
+        run_case(case, None if model_type == '-' else model_type, csv, model_dir, args.repeat, args.workers)
+        return
+
+    results = []
+    print(f"{'case':>12} {'model':>22} {'rows':>11} {'seconds':>10} {'peak (MB)':>10} {'max RSS (MB)':>13}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for rows in args.rows:
+            csv = os.path.join(tmp, f'{rows}.csv')
+            model_dir = os.path.join(tmp, f'models_{rows}')
+            os.makedirs(model_dir)
+            synthetic.write_csv(csv, rows, args.crops)
+            # 先建立清洗缓存，除 load 以外的测量直接读取缓存
+            load_dataset(csv)
+            # 模型读取和预测依赖训练得到的模型文件，需要时先训练
+            cases = [case for case in CASES if case in args.cases]
+            if 'train' not in cases and {'joblib_load', 'predict'} & set(cases):
+                cases.insert(0, 'train')
+            for case in cases:
+                for model_type in ([None] if case == 'load' else args.models):
+                    repeat = 1 if case == 'train' else args.repeat
+                    result = measure(case, model_type, csv, model_dir, repeat, args.workers)
+                    result.update(case=case, model_type=model_type, rows=rows, crops=args.crops)
+                    if case in args.cases:
+                        results.append(result)
+                    rss = f"{result['max_rss_mb']:>13.1f}" if result['max_rss_mb'] is not None else f"{'-':>13}"
+                    print(f"{case:>12} {model_type or '-':>22} {rows:>11,} {result['seconds']:>10.4g} "
+                          f"{result['peak_mb']:>10.1f} {rss}", flush=True)
+
+    report = {'environment': environment(), 'results': results}
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=4)
+    if args.baseline:
+        with open(args.baseline, encoding='utf-8') as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, args.tolerance)
+        print(f"\n{regressions} regression(s) beyond {args.tolerance:.0%}")
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,163 @@
+# coding: utf-8
+"""
+合成数据生成器：按源文件的列名 (Rainfall/Temperature/Ph/Crop/Production) 生成任意规模的产量数据
+
+每种作物的产量与降雨量、气温、pH 的关系系数不同；可指定异常值比例（某一数值列偏离 10 个标准差，
+会被 z-score 清洗剔除）和重复行比例（整行复制前面的记录，会被去重剔除）。
+数据按固定大小的块生成，每块使用由 (seed, 块序号) 派生的随机数，相同参数生成的文件逐字节相同，
+内存占用与总行数无关。安装了 pyarrow 时使用其多线程 CSV 写入。
+
+在仓库根目录运行:
+    python -m benchmarks.synthetic data.csv --rows 10000000
+    python -m benchmarks.synthetic data_dir --rows 50000000 --crops 200 --files 16 --outliers 0.02 --duplicates 0.05
+"""
+import argparse
+import os
+import time
+
+import numpy as np
+import pandas as pd
+
+try:
+    import pyarrow as pa
+    import pyarrow.csv as pa_csv
+except ImportError:
+    pa = None
+
+
+SOURCE_COLUMNS = ['Rainfall', 'Temperature', 'Ph', 'Crop', 'Production']
+# 每块生成的行数，块的划分影响随机数序列，修改后生成的数据随之变化
+CHUNK_ROWS = 1_000_000
+# 各特征的分布 (均值, 标准差)
+FEATURE_DISTRIBUTIONS = {'Rainfall': (1000, 200), 'Temperature': (25, 5), 'Ph': (6.5, 0.5)}
+# 数值保留的小数位数，与真实数据的精度相近，也使文件更小
+DECIMALS = 2
+# 作物名称不含逗号和引号，与真实数据一样不加引号
+WRITE_OPTIONS = pa_csv.WriteOptions(quoting_style='none') if pa is not None else None
+
+
+def crop_names(crops):
+    return np.array([f'crop_{i}' for i in range(crops)])
+
+
+def crop_coefficients(crops, seed=0):
+    """ 每种作物的 (降雨量, 气温, pH, 基础产量) 系数，只由作物数和 seed 决定 """
+    return np.random.default_rng([seed, 0]).uniform(0.5, 2.0, (crops, 4))
+
+
+def make_chunk(rows, crops, outlier_rate=0.01, duplicate_rate=0.0, seed=0, index=0, coefficients=None):
+    """ 生成第 index 块数据 """
+    rng = np.random.default_rng([seed, index + 1])
+    if coefficients is None:
+        coefficients = crop_coefficients(crops, seed)
+    crop_ids = rng.integers(0, crops, rows)
+    features = {column: rng.normal(mean, std, rows) for column, (mean, std) in FEATURE_DISTRIBUTIONS.items()}
+    a, b, c, base = coefficients[crop_ids].T
+    production = (a * features['Rainfall'] / 200 + b * np.sin(features['Temperature'] / 3) * 2
+                  - c * (features['Ph'] - 6.5) ** 2 + base * 3 + rng.normal(0, 0.3, rows))
+    values = np.column_stack([features['Rainfall'], features['Temperature'], features['Ph'], production])
+
+    # 异常值：随机一列偏离 10 个标准差
+    outliers = np.flatnonzero(rng.random(rows) < outlier_rate)
+    columns = rng.integers(0, values.shape[1], len(outliers))
+    scale = values.std(axis=0) if rows > 1 else np.ones(values.shape[1])
+    values[outliers, columns] += rng.choice([-10, 10], len(outliers)) * scale[columns]
+
+    # 重复行：复制本块中更靠前的一行
+    duplicates = np.flatnonzero(rng.random(rows) < duplicate_rate)
+    duplicates = duplicates[duplicates > 0]
+    sources = (rng.random(len(duplicates)) * duplicates).astype('int64')
+    values[duplicates] = values[sources]
+    crop_ids[duplicates] = crop_ids[sources]
+
+    values = np.round(values, DECIMALS)
+    return pd.DataFrame({
+        'Rainfall': values[:, 0],
+        'Temperature': values[:, 1],
+        'Ph': values[:, 2],
+        'Crop': pd.Categorical.from_codes(crop_ids, categories=crop_names(crops)),
+        'Production': values[:, 3],
+    }, columns=SOURCE_COLUMNS)
+
+
+def iter_chunks(rows, crops=50, outlier_rate=0.01, duplicate_rate=0.0, seed=0, start=0):
+    """ 依次生成数据块，start 为第一块的序号，用于多个文件各自生成不重叠的块 """
+    coefficients = crop_coefficients(crops, seed)
+    for index, offset in enumerate(range(0, rows, CHUNK_ROWS), start):
+        yield make_chunk(min(CHUNK_ROWS, rows - offset), crops, outlier_rate, duplicate_rate, seed, index,
+                         coefficients)
+
+
+def make_frame(rows, crops=50, outlier_rate=0.01, duplicate_rate=0.0, seed=0):
+    """ 在内存中生成完整的数据，列名与源文件一致 """
+    chunks = list(iter_chunks(rows, crops, outlier_rate, duplicate_rate, seed))
+    if not chunks:
+        return make_chunk(0, crops, seed=seed)
+    # 各块的作物类别相同，拼接后仍为分类类型
+    return pd.concat(chunks, ignore_index=True)
+
+
+def write_csv(path, rows, crops=50, outlier_rate=0.01, duplicate_rate=0.0, seed=0, start=0):
+    """ 逐块生成并写入一个 CSV 文件 """
+    chunks = iter_chunks(rows, crops, outlier_rate, duplicate_rate, seed, start)
+    if pa is not None:
+        writer = None
+        try:
+            for chunk in chunks:
+                # 作物列由字典编码转换为普通字符串写出，比在 pandas 中逐行转换快得多
+                table = pa.Table.from_pandas(chunk, preserve_index=False)
+                column = table.schema.get_field_index('Crop')
+                table = table.set_column(column, 'Crop', table.column('Crop').cast(pa.string()))
+                if writer is None:
+                    writer = pa_csv.CSVWriter(path, table.schema, write_options=WRITE_OPTIONS)
+                writer.write_table(table)
+        finally:
+            if writer is not None:
+                writer.close()
+        if writer is None:
+            make_chunk(0, crops, seed=seed).to_csv(path, index=False)
+        return
+    with open(path, 'w', newline='', encoding='utf-8') as f:
+        header = True
+        for chunk in chunks:
+            chunk.to_csv(f, header=header, index=False)
+            header = False
+        if header:
+            make_chunk(0, crops, seed=seed).to_csv(f, index=False)
+
+
+def write_dataset(path, rows, crops=50, outlier_rate=0.01, duplicate_rate=0.0, seed=0, files=1):
+    """ files 为 1 时写入单个 CSV，否则在目录 path 下写入 files 个分区文件，返回写入的文件列表 """
+    if files <= 1:
+        write_csv(path, rows, crops, outlier_rate, duplicate_rate, seed)
+        return [path]
+    os.makedirs(path, exist_ok=True)
+    paths = []
+    # 每个文件从不同的块序号开始，文件之间的数据互不重复
+    chunks_per_file = max(1, -(-(rows // files + 1) // CHUNK_ROWS))
+    for i in range(files):
+        file_rows = rows // files + (1 if i < rows % files else 0)
+        paths.append(os.path.join(path, f'part-{i:05d}.csv'))
+        write_csv(paths[-1], file_rows, crops, outlier_rate, duplicate_rate, seed, start=i * chunks_per_file)
+    return paths
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('path', help='输出的 CSV 文件，--files 大于 1 时为输出目录')
+    parser.add_argument('--rows', type=int, default=1_000_000)
+    parser.add_argument('--crops', type=int, default=50)
+    parser.add_argument('--outliers', type=float, default=0.01, help='异常值行的比例')
+    parser.add_argument('--duplicates', type=float, default=0.0, help='重复行的比例')
+    parser.add_argument('--files', type=int, default=1)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    paths = write_dataset(args.path, args.rows, args.crops, args.outliers, args.duplicates, args.seed, args.files)
+    size = sum(os.path.getsize(path) for path in paths) / 1024 ** 2
+    print(f"wrote {args.rows:,} rows to {len(paths)} file(s), {size:.1f} MB in {time.perf_counter() - start:.1f} s")
+
+
+if __name__ == '__main__':
+    main()
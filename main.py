@@ -1,6 +1,7 @@
 # coding:utf-8
 import os
 import sys
+from multiprocessing import freeze_support
 from PySide6.QtCore import Qt, QTranslator
 # from PySide6.QtGui import QFont
 from PySide6.QtWidgets import QApplication
@@ -9,26 +10,30 @@ from app.common.config import cfg
 from app.view.main_window import MainWindow
 from app.resource import resource_rc
 
-# enable dpi scale
-if cfg.get(cfg.dpiScale) != "Auto":
-    os.environ["QT_ENABLE_HIGHDPI_SCALING"] = "0"
-    os.environ["QT_SCALE_FACTOR"] = str(cfg.get(cfg.dpiScale))
+if __name__ == '__main__':
+    # 训练使用进程池，子进程会重新导入本模块，窗口只能在主进程中创建
+    freeze_support()
 
-# create application
-app = QApplication(sys.argv)
-app.setAttribute(Qt.AA_DontCreateNativeWidgetSiblings)
+    # enable dpi scale
+    if cfg.get(cfg.dpiScale) != "Auto":
+        os.environ["QT_ENABLE_HIGHDPI_SCALING"] = "0"
+        os.environ["QT_SCALE_FACTOR"] = str(cfg.get(cfg.dpiScale))
 
-# internationalization
-locale = cfg.get(cfg.language).value
-translator = FluentTranslator(locale)
-galleryTranslator = QTranslator()
-galleryTranslator.load(locale, "app", ".", ":/app/i18n")
+    # create application
+    app = QApplication(sys.argv)
+    app.setAttribute(Qt.AA_DontCreateNativeWidgetSiblings)
 
-app.installTranslator(translator)
-app.installTranslator(galleryTranslator)
+    # internationalization
+    locale = cfg.get(cfg.language).value
+    translator = FluentTranslator(locale)
+    galleryTranslator = QTranslator()
+    galleryTranslator.load(locale, "app", ".", ":/app/i18n")
 
-# create main window
-w = MainWindow()
-w.show()
+    app.installTranslator(translator)
+    app.installTranslator(galleryTranslator)
 
-app.exec()
+    # create main window
+    w = MainWindow()
+    w.show()
+
+    app.exec()